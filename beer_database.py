@@ -5,76 +5,399 @@
 
 import sqlite3
 import os
-from typing import List, Tuple, Optional
+import threading
+from collections import namedtuple
+from typing import List, Set, Tuple, Optional, Iterable, Iterator
+
+# Строки таблиц: доступ по индексу, как у кортежа, и по имени колонки
+# как атрибуту, без словаря на каждую строку
+BeerRow = namedtuple('BeerRow', [
+    'id', 'tap_position', 'brewery', 'name', 'style', 'price_per_liter',
+    'description', 'cost_400ml', 'cost_250ml', 'untappd_url', 'abv', 'ibu',
+])
+HistoryRow = namedtuple('HistoryRow', [
+    'id', 'brewery', 'name', 'style', 'description',
+    'untappd_url', 'abv', 'ibu', 'added_count', 'last_added',
+])
+
+# Тексты запросов вынесены в константы модуля: строка не пересобирается
+# при каждом вызове, а кэш выражений соединения получает один и тот же ключ
+_SQL_INSERT_TAP = '''
+    INSERT INTO beer_taps (tap_position, brewery, name, style,
+                           price_per_liter, description, cost_400ml, cost_250ml,
+                           untappd_url, abv, ibu)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_SELECT_BY_TAP = '''
+    SELECT id, tap_position, brewery, name, style,
+           price_per_liter, description, cost_400ml, cost_250ml, untappd_url, abv, ibu
+    FROM beer_taps WHERE tap_position = ?
+'''
+
+_SQL_SELECT_ALL = '''
+    SELECT id, tap_position, brewery, name, style,
+           price_per_liter, description, cost_400ml, cost_250ml, untappd_url, abv, ibu
+    FROM beer_taps ORDER BY tap_position
+'''
+
+_SQL_COUNT_TAPS = 'SELECT COUNT(*) FROM beer_taps'
+
+_SQL_SELECT_TAP_POSITIONS = 'SELECT tap_position FROM beer_taps'
+
+_SQL_DELETE_TAP = 'DELETE FROM beer_taps WHERE tap_position = ?'
+
+_SQL_UPSERT_HISTORY = '''
+    INSERT INTO beer_history
+    (brewery, name, style, description, untappd_url, abv, ibu)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(brewery, name) DO UPDATE SET
+        added_count = added_count + 1,
+        last_added = CURRENT_TIMESTAMP,
+        style = excluded.style,
+        description = excluded.description,
+        untappd_url = excluded.untappd_url,
+        abv = excluded.abv,
+        ibu = excluded.ibu
+'''
+
+_SQL_SELECT_HISTORY = '''
+    SELECT id, brewery, name, style, description,
+           untappd_url, abv, ibu, added_count, last_added
+    FROM beer_history
+    ORDER BY added_count DESC, last_added DESC
+    LIMIT ?
+'''
+
+_SQL_SEARCH_HISTORY = '''
+    SELECT id, brewery, name, style, description,
+           untappd_url, abv, ibu, added_count, last_added
+    FROM beer_history
+    WHERE name LIKE ? OR brewery LIKE ?
+    ORDER BY added_count DESC, last_added DESC
+    LIMIT ?
+'''
+
+_SQL_SELECT_HISTORY_BY_ID = '''
+    SELECT id, brewery, name, style, description,
+           untappd_url, abv, ibu, added_count, last_added
+    FROM beer_history
+    WHERE id = ?
+'''
+
+_SQL_SEARCH_HISTORY_FTS = '''
+    SELECT id, brewery, name, style, description,
+           untappd_url, abv, ibu, added_count, last_added
+    FROM beer_history
+    WHERE id IN (SELECT rowid FROM beer_history_fts WHERE beer_history_fts MATCH ?)
+    ORDER BY added_count DESC, last_added DESC
+    LIMIT ?
+'''
+
+_SQL_DELETE_HISTORY = 'DELETE FROM beer_history WHERE id = ?'
+
+_SQL_CLEAR_HISTORY = 'DELETE FROM beer_history'
 
 class BeerDatabase:
     """Класс для работы с базой данных пивных кранов"""
     
+    # Маппинг полей на названия колонок в БД
+    _FIELD_COLUMNS = {
+        'brewery': 'brewery',
+        'name': 'name',
+        'style': 'style',
+        'price': 'price_per_liter',
+        'cost_400ml': 'cost_400ml',
+        'cost_250ml': 'cost_250ml',
+        'description': 'description',
+        'untappd_url': 'untappd_url',
+        'abv': 'abv',
+        'ibu': 'ibu'
+    }
+    
+    # Версия схемы в PRAGMA user_version. Увеличивается при изменении DDL
+    # в init_database, чтобы существующие базы прошли его заново
+    _SCHEMA_VERSION = 1
+    
+    # Запросы обновления одной колонки собираются один раз
+    _COLUMN_UPDATE_SQL = {
+        column: f"UPDATE beer_taps SET {column} = ? WHERE tap_position = ?"
+        for column in _FIELD_COLUMNS.values()
+    }
+    
     def __init__(self, db_path: str = "beer_database.db"):
         """Инициализация подключения к базе данных
         
         Args:
-            db_path: Путь к файлу базы данных
+            db_path: Путь к файлу базы данных или ":memory:" для базы
+                     в памяти (см. persist)
         """
         self.db_path = db_path
+        # Одно долгоживущее соединение на весь объект вместо открытия
+        # файла базы на каждый вызов. Кэш подготовленных выражений живет
+        # в соединении, поэтому одинаковые запросы не компилируются повторно
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=256)
+        # RLock: транзакция, открытая через begin(), держит блокировку
+        # до commit(), а методы внутри нее захватывают ее повторно
+        self._lock = threading.RLock()
+        self._in_tx = False
         self.init_database()
+        # SQLite не хранит число строк, COUNT(*) обходит всю таблицу.
+        # Считаем один раз при открытии и дальше ведем счетчик сами.
+        # Счетчик меняется только под self._lock вместе с записью
+        self._tap_count = self._fetchone(_SQL_COUNT_TAPS)[0]
+    
+    def close(self):
+        """Закрывает соединение с базой данных"""
+        with self._lock:
+            self._conn.close()
+    
+    def persist(self, path: str):
+        """Сохраняет копию базы в файл через sqlite3 backup API
+        
+        Позволяет работать с BeerDatabase(":memory:") без обращений к диску
+        и записывать файл только когда это действительно нужно.
+        
+        Args:
+            path: Путь к файлу, в который копируется база
+        """
+        target = sqlite3.connect(path)
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+    
+    def begin(self):
+        """Открывает транзакцию, управляемую вызывающим кодом
+        
+        Все операции до commit() попадают в одну транзакцию
+        и фиксируются одним fsync. BEGIN IMMEDIATE берет блокировку
+        записи сразу, а не повышает ее посреди транзакции, где другой
+        писатель вернул бы SQLITE_BUSY.
+        """
+        self._lock.acquire()
+        if self._in_tx:
+            # Вложенные транзакции не поддерживаются: RLock пустил бы
+            # тот же поток повторно, а второй BEGIN сломал бы внешнюю
+            self._lock.release()
+            raise sqlite3.OperationalError("Транзакция уже открыта")
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        self._in_tx = True
+    
+    def commit(self):
+        """Фиксирует транзакцию, открытую через begin()"""
+        try:
+            self._conn.execute("COMMIT")
+        except Exception:
+            # COMMIT не прошел (например, SQLITE_BUSY): откатываем до снятия
+            # блокировки, чтобы транзакция не осталась открытой на общем
+            # соединении, которым пользуются другие потоки
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            self._tap_count = self._fetchone(_SQL_COUNT_TAPS)[0]
+            raise
+        finally:
+            self._in_tx = False
+            self._lock.release()
+    
+    def rollback(self):
+        """Откатывает транзакцию, открытую через begin()"""
+        try:
+            self._conn.execute("ROLLBACK")
+            # Откаченные вставки и удаления уже учтены в счетчике
+            self._tap_count = self._fetchone(_SQL_COUNT_TAPS)[0]
+        finally:
+            self._in_tx = False
+            self._lock.release()
+    
+    def _execute(self, sql: str, params: Tuple = ()) -> int:
+        """Выполняет изменяющий запрос
+        
+        Returns:
+            Количество затронутых строк
+        """
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+    
+    def _fetchone(self, sql: str, params: Tuple = (), row_type=None) -> Optional[Tuple]:
+        """Выполняет запрос и возвращает первую строку
+        
+        Если передан row_type (namedtuple), строка оборачивается в него.
+        """
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        if row is None or row_type is None:
+            return row
+        return row_type._make(row)
+    
+    def _fetchall(self, sql: str, params: Tuple = (), row_type=None) -> List[Tuple]:
+        """Выполняет запрос и возвращает все строки
+        
+        Если передан row_type (namedtuple), строки оборачиваются в него.
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if row_type is None:
+            return rows
+        return list(map(row_type._make, rows))
     
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Создаем таблицу для пивных кранов
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS beer_taps (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tap_position INTEGER UNIQUE NOT NULL,
-                brewery TEXT NOT NULL,
-                name TEXT NOT NULL,
-                style TEXT NOT NULL,
-                price_per_liter REAL NOT NULL,
-                description TEXT,
-                cost_400ml REAL NOT NULL,
-                cost_250ml REAL NOT NULL,
-                untappd_url TEXT,
-                abv REAL,
-                ibu REAL
-            )
-        ''')
-        
-        # Создаем индекс для быстрого поиска по номеру крана
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_tap_position 
-            ON beer_taps(tap_position)
-        ''')
-        
-        # Создаем таблицу истории пива для быстрого добавления
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS beer_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                brewery TEXT NOT NULL,
-                name TEXT NOT NULL,
-                style TEXT NOT NULL,
-                description TEXT,
-                untappd_url TEXT,
-                abv REAL,
-                ibu REAL,
-                added_count INTEGER DEFAULT 1,
-                last_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Создаем индекс для поиска по названию пива
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_beer_name 
-            ON beer_history(name)
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            cursor = self._conn.cursor()
+            
+            # WAL убирает создание/удаление журнала на каждый коммит,
+            # а synchronous=NORMAL в режиме WAL не теряет целостность.
+            # mmap позволяет читать страницы без копирования из ядра
+            cursor.executescript('''
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=memory;
+                PRAGMA cache_size=-64000;
+                PRAGMA mmap_size=268435456;
+            ''')
+            
+            # Схема уже создана текущей версией: пропускаем весь DDL
+            if cursor.execute("PRAGMA user_version").fetchone()[0] >= self._SCHEMA_VERSION:
+                # Таблицу FTS все равно проверяем: базу могли открыть сборкой
+                # SQLite без FTS5 после того, как версия была записана
+                try:
+                    cursor.execute("SELECT rowid FROM beer_history_fts LIMIT 0")
+                    self._has_fts = True
+                except sqlite3.OperationalError:
+                    self._has_fts = False
+                return
+            
+            # Создаем таблицу для пивных кранов
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS beer_taps (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tap_position INTEGER UNIQUE NOT NULL,
+                    brewery TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    style TEXT NOT NULL,
+                    price_per_liter REAL NOT NULL,
+                    description TEXT,
+                    cost_400ml REAL NOT NULL,
+                    cost_250ml REAL NOT NULL,
+                    untappd_url TEXT,
+                    abv REAL,
+                    ibu REAL
+                )
+            ''')
+            
+            # Создаем индекс для быстрого поиска по номеру крана
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tap_position
+                ON beer_taps(tap_position)
+            ''')
+            
+            # Создаем таблицу истории пива для быстрого добавления
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS beer_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    brewery TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    style TEXT NOT NULL,
+                    description TEXT,
+                    untappd_url TEXT,
+                    abv REAL,
+                    ibu REAL,
+                    added_count INTEGER DEFAULT 1,
+                    last_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Создаем индекс для поиска по названию пива
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_beer_name
+                ON beer_history(name)
+            ''')
+            
+            # Пара пивоварня + название уникальна, на ней работает UPSERT
+            # в save_to_history. Старые дубли сливаем в последнюю запись
+            # пары: счетчики складываются, дата берется самая поздняя
+            cursor.execute('''
+                UPDATE beer_history SET
+                    added_count = (SELECT SUM(h.added_count) FROM beer_history h
+                                   WHERE h.brewery = beer_history.brewery AND h.name = beer_history.name),
+                    last_added = (SELECT MAX(h.last_added) FROM beer_history h
+                                  WHERE h.brewery = beer_history.brewery AND h.name = beer_history.name)
+                WHERE id IN (
+                    SELECT MAX(id) FROM beer_history GROUP BY brewery, name HAVING COUNT(*) > 1
+                )
+            ''')
+            merged = cursor.execute('''
+                DELETE FROM beer_history WHERE id NOT IN (
+                    SELECT MAX(id) FROM beer_history GROUP BY brewery, name
+                )
+            ''').rowcount
+            if merged:
+                print(f"История: объединено повторяющихся записей: {merged}")
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_history_brewery_name
+                ON beer_history(brewery, name)
+            ''')
+            
+            # Индекс в порядке сортировки истории: ORDER BY ... LIMIT
+            # читается прямо из индекса без полной сортировки
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_history_rank
+                ON beer_history(added_count DESC, last_added DESC)
+            ''')
+            
+            # Полнотекстовый индекс по пивоварне и названию для поиска
+            # в истории вместо LIKE '%...%' по всей таблице. Без FTS5
+            # в сборке SQLite поиск остается на LIKE
+            fts_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'beer_history_fts'"
+            ).fetchone() is not None
+            try:
+                cursor.executescript('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS beer_history_fts
+                    USING fts5(brewery, name, content='beer_history', content_rowid='id');
+                    
+                    CREATE TRIGGER IF NOT EXISTS beer_history_fts_ai AFTER INSERT ON beer_history
+                    BEGIN
+                        INSERT INTO beer_history_fts(rowid, brewery, name)
+                        VALUES (new.id, new.brewery, new.name);
+                    END;
+                    
+                    CREATE TRIGGER IF NOT EXISTS beer_history_fts_ad AFTER DELETE ON beer_history
+                    BEGIN
+                        INSERT INTO beer_history_fts(beer_history_fts, rowid, brewery, name)
+                        VALUES ('delete', old.id, old.brewery, old.name);
+                    END;
+                    
+                    CREATE TRIGGER IF NOT EXISTS beer_history_fts_au
+                    AFTER UPDATE OF brewery, name ON beer_history
+                    BEGIN
+                        INSERT INTO beer_history_fts(beer_history_fts, rowid, brewery, name)
+                        VALUES ('delete', old.id, old.brewery, old.name);
+                        INSERT INTO beer_history_fts(rowid, brewery, name)
+                        VALUES (new.id, new.brewery, new.name);
+                    END;
+                ''')
+                if not fts_exists:
+                    # Индексируем записи, появившиеся до создания таблицы
+                    cursor.execute("INSERT INTO beer_history_fts(beer_history_fts) VALUES ('rebuild')")
+                self._has_fts = True
+            except sqlite3.OperationalError:
+                self._has_fts = False
+            
+            # Без FTS5 версию не записываем: DDL повторится при следующем
+            # открытии и создаст индекс, если он станет доступен
+            if self._has_fts:
+                cursor.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
     
-    def add_beer(self, tap_position: int, brewery: str, name: str, 
-                 style: str, price_per_liter: float, description: str = "", 
+    def add_beer(self, tap_position: int, brewery: str, name: str,
+                 style: str, price_per_liter: float, description: str = "",
                  cost_400ml: float = 0.0, cost_250ml: float = 0.0, untappd_url: str = "",
                  abv: float = None, ibu: float = None) -> bool:
         """Добавляет новое пиво в кран
@@ -93,84 +416,106 @@ class BeerDatabase:
             ibu: Горечь пива (International Bitterness Units)
             
         Returns:
-            True если успешно добавлено, False если ошибка
+            True если успешно добавлено, False если кран уже занят
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO beer_taps (tap_position, brewery, name, style, 
-                                     price_per_liter, description, cost_400ml, cost_250ml, 
-                                     untappd_url, abv, ibu)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (tap_position, brewery, name, style, price_per_liter, description, 
-                  cost_400ml, cost_250ml, untappd_url, abv, ibu))
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                self._execute(_SQL_INSERT_TAP, (tap_position, brewery, name, style, price_per_liter,
+                                                description, cost_400ml, cost_250ml, untappd_url, abv, ibu))
+                self._tap_count += 1
             return True
-            
+        
         except sqlite3.IntegrityError:
             print(f"Ошибка: Кран {tap_position} уже существует")
             return False
-        except Exception as e:
-            print(f"Ошибка при добавлении пива: {e}")
-            return False
     
-    def get_beer_by_tap(self, tap_position: int) -> Optional[Tuple]:
-        """Получает информацию о пиве по номеру крана
+    def add_beers_bulk(self, rows: Iterable[Tuple]) -> int:
+        """Добавляет пачку пив одним executemany в одной транзакции
+        
+        Цикл по строкам выполняется внутри sqlite3 на C, без
+        Python-вызова execute на каждую строку.
         
         Args:
-            tap_position: Номер позиции крана
+            rows: Кортежи (tap_position, brewery, name, style, price_per_liter,
+                  description, cost_400ml, cost_250ml, untappd_url, abv, ibu)
             
         Returns:
-            Кортеж с данными о пиве или None если не найдено
+            Количество добавленных пив, 0 если пачка отклонена
         """
+        # Приводим значения к точным int/float/str/None: на подклассах
+        # (bool, numpy, str-наследники) sqlite3 уходит в медленную
+        # универсальную ветку привязки параметров
+        rows = (
+            (int(tap), str(brewery), str(name), str(style), float(price),
+             str(description or ""), float(cost_400ml), float(cost_250ml), str(untappd_url or ""),
+             None if abv is None else float(abv), None if ibu is None else float(ibu))
+            for tap, brewery, name, style, price, description, cost_400ml, cost_250ml,
+                untappd_url, abv, ibu in rows
+        )
+        
+        self.begin()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, tap_position, brewery, name, style, 
-                       price_per_liter, description, cost_400ml, cost_250ml, untappd_url, abv, ibu
-                FROM beer_taps WHERE tap_position = ?
-            ''', (tap_position,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            return result
+            cursor = self._conn.executemany(_SQL_INSERT_TAP, rows)
+        except sqlite3.IntegrityError as e:
+            self.rollback()
+            print(f"Ошибка: Пачка не добавлена, кран уже существует ({e})")
+            return 0
+        except Exception:
+            self.rollback()
+            raise
+        self._tap_count += cursor.rowcount
+        self.commit()
+        return cursor.rowcount
+    
+    def get_beer_by_tap(self, tap_position: int) -> Optional[BeerRow]:
+        """Получает информацию о пиве по номеру крана
+        
+        Args:
+            tap_position: Номер позиции крана
             
-        except Exception as e:
-            print(f"Ошибка при получении пива: {e}")
-            return None
+        Returns:
+            Строка с данными о пиве или None если не найдено
+        """
+        return self._fetchone(_SQL_SELECT_BY_TAP, (tap_position,), BeerRow)
     
-    def get_all_beers(self) -> List[Tuple]:
+    def iter_all_beers(self) -> Iterator[BeerRow]:
+        """Построчно отдает все пива из базы данных
+        
+        Строки читаются пачками по arraysize, весь результат
+        в памяти не собирается. Незавершенный запрос нельзя оставлять
+        на общем соединении, пока в нем пишут другие потоки, поэтому
+        блокировка держится до конца обхода. Рассчитано на однопоточное
+        консольное приложение, остальным нужен get_all_beers.
+        
+        Yields:
+            Строки с данными о пивах
+        """
+        with self._lock:
+            cursor = self._conn.execute(_SQL_SELECT_ALL)
+            cursor.arraysize = 64
+            rows = cursor.fetchmany()
+            while rows:
+                yield from map(BeerRow._make, rows)
+                rows = cursor.fetchmany()
+    
+    def get_all_beers(self) -> List[BeerRow]:
         """Получает все пива из базы данных
         
         Returns:
-            Список кортежей с данными о всех пивах
+            Список строк с данными о всех пивах
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, tap_position, brewery, name, style, 
-                       price_per_liter, description, cost_400ml, cost_250ml, untappd_url, abv, ibu
-                FROM beer_taps ORDER BY tap_position
-            ''')
-            
-            results = cursor.fetchall()
-            conn.close()
-            return results
-            
-        except Exception as e:
-            print(f"Ошибка при получении всех пив: {e}")
-            return []
+        return self._fetchall(_SQL_SELECT_ALL, (), BeerRow)
+    
+    def get_occupied_taps(self) -> Set[int]:
+        """Получает номера занятых кранов одним запросом
+        
+        Returns:
+            Множество номеров кранов, в которых есть пиво
+        """
+        return {row[0] for row in self._fetchall(_SQL_SELECT_TAP_POSITIONS)}
     
     def update_beer(self, tap_position: int, brewery: str = None, name: str = None,
-                   style: str = None, price_per_liter: float = None, 
+                   style: str = None, price_per_liter: float = None,
                    description: str = None, cost_400ml: float = None, cost_250ml: float = None) -> bool:
         """Обновляет информацию о пиве
         
@@ -185,58 +530,41 @@ class BeerDatabase:
             cost_250ml: Стоимость за 250 мл
             
         Returns:
-            True если успешно обновлено, False если ошибка
+            True если успешно обновлено, False если нет полей или кран не найден
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Формируем запрос обновления только для переданных полей
-            update_fields = []
-            values = []
-            
-            if brewery is not None:
-                update_fields.append("brewery = ?")
-                values.append(brewery)
-            if name is not None:
-                update_fields.append("name = ?")
-                values.append(name)
-            if style is not None:
-                update_fields.append("style = ?")
-                values.append(style)
-            if price_per_liter is not None:
-                update_fields.append("price_per_liter = ?")
-                values.append(price_per_liter)
-            if description is not None:
-                update_fields.append("description = ?")
-                values.append(description)
-            if cost_400ml is not None:
-                update_fields.append("cost_400ml = ?")
-                values.append(cost_400ml)
-            if cost_250ml is not None:
-                update_fields.append("cost_250ml = ?")
-                values.append(cost_250ml)
-            
-            if not update_fields:
-                print("Нет полей для обновления")
-                return False
-            
+        # Формируем запрос обновления только для переданных полей
+        changes = [
+            (column, value) for column, value in (
+                ('brewery', brewery),
+                ('name', name),
+                ('style', style),
+                ('price_per_liter', price_per_liter),
+                ('description', description),
+                ('cost_400ml', cost_400ml),
+                ('cost_250ml', cost_250ml),
+            ) if value is not None
+        ]
+        
+        if not changes:
+            print("Нет полей для обновления")
+            return False
+        
+        if len(changes) == 1:
+            # Частый случай - одно поле, берем готовый запрос
+            column, value = changes[0]
+            query = self._COLUMN_UPDATE_SQL[column]
+            values = (value, tap_position)
+        else:
+            set_clause = ', '.join(f"{column} = ?" for column, _ in changes)
+            query = f"UPDATE beer_taps SET {set_clause} WHERE tap_position = ?"
+            values = [value for _, value in changes]
             values.append(tap_position)
-            
-            query = f"UPDATE beer_taps SET {', '.join(update_fields)} WHERE tap_position = ?"
-            cursor.execute(query, values)
-            
-            if cursor.rowcount == 0:
-                print(f"Кран {tap_position} не найден")
-                return False
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при обновлении пива: {e}")
+        
+        if self._execute(query, values) == 0:
+            print(f"Кран {tap_position} не найден")
             return False
+        
+        return True
     
     def update_beer_field(self, tap_position: int, field: str, value) -> bool:
         """Обновляет конкретное поле пива
@@ -247,45 +575,19 @@ class BeerDatabase:
             value: Новое значение
             
         Returns:
-            True если успешно обновлено, False если ошибка
+            True если успешно обновлено, False если поле неверное или кран не найден
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Маппинг полей на названия колонок в БД
-            field_mapping = {
-                'brewery': 'brewery',
-                'name': 'name', 
-                'style': 'style',
-                'price': 'price_per_liter',
-                'cost_400ml': 'cost_400ml',
-                'cost_250ml': 'cost_250ml',
-                'description': 'description',
-                'untappd_url': 'untappd_url',
-                'abv': 'abv',
-                'ibu': 'ibu'
-            }
-            
-            if field not in field_mapping:
-                print(f"Неверное поле: {field}")
-                return False
-            
-            db_field = field_mapping[field]
-            query = f"UPDATE beer_taps SET {db_field} = ? WHERE tap_position = ?"
-            cursor.execute(query, (value, tap_position))
-            
-            if cursor.rowcount == 0:
-                print(f"Кран {tap_position} не найден")
-                return False
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при обновлении поля {field}: {e}")
+        column = self._FIELD_COLUMNS.get(field)
+        if column is None:
+            print(f"Неверное поле: {field}")
+            return False
+        
+        query = self._COLUMN_UPDATE_SQL[column]
+        if self._execute(query, (value, tap_position)) == 0:
+            print(f"Кран {tap_position} не найден")
             return False
+        
+        return True
     
     def delete_beer(self, tap_position: int) -> bool:
         """Удаляет пиво из крана
@@ -294,46 +596,30 @@ class BeerDatabase:
             tap_position: Номер позиции крана
             
         Returns:
-            True если успешно удалено, False если ошибка
+            True если успешно удалено, False если кран не найден
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM beer_taps WHERE tap_position = ?', (tap_position,))
-            
-            if cursor.rowcount == 0:
-                print(f"Кран {tap_position} не найден")
-                return False
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при удалении пива: {e}")
+        with self._lock:
+            deleted = self._execute(_SQL_DELETE_TAP, (tap_position,))
+            self._tap_count -= deleted
+        if deleted == 0:
+            print(f"Кран {tap_position} не найден")
             return False
+        
+        return True
     
     def get_tap_count(self) -> int:
         """Получает количество кранов в базе данных
         
+        Счетчик ведется в этом объекте: записи из другого процесса
+        (например, консольного приложения при запущенном боте) он
+        не видит до повторного открытия базы.
+        
         Returns:
             Количество кранов
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM beer_taps')
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
-            
-        except Exception as e:
-            print(f"Ошибка при подсчете кранов: {e}")
-            return 0
+        return self._tap_count
     
-    def save_to_history(self, brewery: str, name: str, style: str, 
+    def save_to_history(self, brewery: str, name: str, style: str,
                        description: str = "", untappd_url: str = "",
                        abv: float = None, ibu: float = None) -> bool:
         """Сохраняет пиво в историю или обновляет счетчик
@@ -348,133 +634,65 @@ class BeerDatabase:
             ibu: Горечь
             
         Returns:
-            True если успешно, False если ошибка
+            True после сохранения
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Проверяем, есть ли уже такое пиво в истории
-            cursor.execute('''
-                SELECT id, added_count FROM beer_history 
-                WHERE brewery = ? AND name = ?
-            ''', (brewery, name))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Обновляем счетчик и дату
-                beer_id, count = existing
-                cursor.execute('''
-                    UPDATE beer_history 
-                    SET added_count = ?, last_added = CURRENT_TIMESTAMP,
-                        style = ?, description = ?, untappd_url = ?, abv = ?, ibu = ?
-                    WHERE id = ?
-                ''', (count + 1, style, description, untappd_url, abv, ibu, beer_id))
-            else:
-                # Добавляем новое пиво в историю
-                cursor.execute('''
-                    INSERT INTO beer_history 
-                    (brewery, name, style, description, untappd_url, abv, ibu)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (brewery, name, style, description, untappd_url, abv, ibu))
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при сохранении в историю: {e}")
-            return False
+        # Новое пиво добавляется, для существующего растет счетчик
+        self._execute(_SQL_UPSERT_HISTORY, (brewery, name, style, description, untappd_url, abv, ibu))
+        
+        return True
     
-    def get_beer_history(self, limit: int = 20) -> List[Tuple]:
+    def get_beer_history(self, limit: int = 20) -> List[HistoryRow]:
         """Получает историю пива, отсортированную по частоте использования
         
         Args:
             limit: Максимальное количество записей
             
         Returns:
-            Список кортежей с данными из истории
+            Список строк с данными из истории
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, brewery, name, style, description, 
-                       untappd_url, abv, ibu, added_count, last_added
-                FROM beer_history 
-                ORDER BY added_count DESC, last_added DESC
-                LIMIT ?
-            ''', (limit,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            return results
-            
-        except Exception as e:
-            print(f"Ошибка при получении истории: {e}")
-            return []
+        return self._fetchall(_SQL_SELECT_HISTORY, (limit,), HistoryRow)
     
-    def search_beer_history(self, search_term: str, limit: int = 10) -> List[Tuple]:
+    def search_beer_history(self, search_term: str, limit: int = 10) -> List[HistoryRow]:
         """Поиск пива в истории по названию или пивоварне
         
+        Ищется подстрока в пивоварне или названии через LIKE, как и раньше.
+        Если запрос состоит из обычных слов (буквы и цифры), к этому
+        добавляются совпадения полнотекстового индекса: каждое слово как
+        начало слова в пивоварне или названии, без учета регистра и для
+        кириллицы. Результаты объединяются и сортируются так же, как история.
+        
         Args:
             search_term: Строка для поиска
             limit: Максимальное количество результатов
             
         Returns:
-            Список кортежей с найденными пивами
+            Список строк с найденными пивами
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            search_pattern = f"%{search_term}%"
-            cursor.execute('''
-                SELECT id, brewery, name, style, description, 
-                       untappd_url, abv, ibu, added_count, last_added
-                FROM beer_history 
-                WHERE name LIKE ? OR brewery LIKE ?
-                ORDER BY added_count DESC, last_added DESC
-                LIMIT ?
-            ''', (search_pattern, search_pattern, limit))
-            
-            results = cursor.fetchall()
-            conn.close()
-            return results
-            
-        except Exception as e:
-            print(f"Ошибка при поиске в истории: {e}")
-            return []
+        search_pattern = f"%{search_term}%"
+        rows = self._fetchall(_SQL_SEARCH_HISTORY, (search_pattern, search_pattern, limit), HistoryRow)
+        
+        words = search_term.split()
+        if self._has_fts and words and all(word.isalnum() for word in words):
+            match = " ".join(f'"{word}"*' for word in words)
+            found = {row.id for row in rows}
+            rows += [row for row in self._fetchall(_SQL_SEARCH_HISTORY_FTS,
+                                                   ("{brewery name}: " + match, limit), HistoryRow)
+                     if row.id not in found]
+            rows.sort(key=lambda row: (row.added_count or 0, row.last_added or ""), reverse=True)
+            del rows[limit:]
+        
+        return rows
     
-    def get_beer_from_history(self, history_id: int) -> Optional[Tuple]:
+    def get_beer_from_history(self, history_id: int) -> Optional[HistoryRow]:
         """Получает конкретное пиво из истории по ID
         
         Args:
             history_id: ID записи в истории
             
         Returns:
-            Кортеж с данными или None
+            Строка с данными или None
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, brewery, name, style, description, 
-                       untappd_url, abv, ibu, added_count, last_added
-                FROM beer_history 
-                WHERE id = ?
-            ''', (history_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            return result
-            
-        except Exception as e:
-            print(f"Ошибка при получении пива из истории: {e}")
-            return None
+        return self._fetchone(_SQL_SELECT_HISTORY_BY_ID, (history_id,), HistoryRow)
     
     def delete_from_history(self, history_id: int) -> bool:
         """Удаляет запись из истории пива
@@ -483,43 +701,37 @@ class BeerDatabase:
             history_id: ID записи в истории
             
         Returns:
-            True если успешно удалено, False если ошибка
+            True если успешно удалено, False если запись не найдена
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM beer_history WHERE id = ?', (history_id,))
-            
-            if cursor.rowcount == 0:
-                print(f"Запись {history_id} не найдена в истории")
-                conn.close()
-                return False
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при удалении из истории: {e}")
+        if self._execute(_SQL_DELETE_HISTORY, (history_id,)) == 0:
+            print(f"Запись {history_id} не найдена в истории")
             return False
+        
+        return True
     
     def clear_all_history(self) -> bool:
         """Очищает всю историю пива
         
         Returns:
-            True если успешно, False если ошибка
+            True после очистки
         """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM beer_history')
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Ошибка при очистке истории: {e}")
-            return False
+        self._execute(_SQL_CLEAR_HISTORY)
+        
+        return True
+
+# Общий экземпляр базы по умолчанию для скриптов и бота
+_DEFAULT: Optional[BeerDatabase] = None
+
+def get_default() -> BeerDatabase:
+    """Возвращает общий экземпляр BeerDatabase для файла по умолчанию
+    
+    Соединение открывается и схема проверяется только при первом вызове,
+    дальше все вызывающие работают через одно соединение.
+    
+    Returns:
+        Экземпляр BeerDatabase
+    """
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = BeerDatabase()
+    return _DEFAULT
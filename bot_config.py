@@ -4,7 +4,15 @@
 """
 
 import os
-from typing import List
+import sys
+from typing import Dict, List, Tuple
+
+# Разобранные .env файлы: путь -> (st_mtime_ns, переменные).
+# Повторная загрузка неизмененного файла обходится без чтения и разбора
+_ENV_CACHE: Dict[str, Tuple[int, Dict[str, str]]] = {}
+
+# Последняя разобранная строка ADMIN_IDS и ее результат
+_admin_cache: Dict[str, object] = {}
 
 class BotConfig:
     """Класс для управления конфигурацией бота"""
@@ -19,16 +27,40 @@ class BotConfig:
         Returns:
             True если файл загружен успешно
         """
-        if not os.path.exists(env_path):
+        # Файл сразу открывается, без отдельной проверки существования.
+        # Время изменения берется у открытого дескриптора, поэтому кэш
+        # всегда соответствует прочитанному содержимому
+        try:
+            f = open(env_path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Ошибка при загрузке .env файла: {e}")
             return False
         
         try:
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key.strip()] = value.strip()
+            with f:
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+                cached = _ENV_CACHE.get(env_path)
+                if cached is not None and cached[0] == mtime:
+                    os.environ.update(cached[1])
+                    return True
+                
+                # Файл читается целиком, строки разбираются в локальный словарь,
+                # а os.environ (putenv на каждую запись) обновляется один раз
+                data = f.read()
+            
+            env = {}
+            for line in data.splitlines():
+                line = line.strip()
+                if not line or line[0] == '#':
+                    continue
+                key, sep, value = line.partition('=')
+                if sep:
+                    env[key.strip()] = value.strip()
+            
+            _ENV_CACHE[env_path] = (mtime, env)
+            os.environ.update(env)
             return True
         except Exception as e:
             print(f"Ошибка при загрузке .env файла: {e}")
@@ -45,10 +77,11 @@ class BotConfig:
         Returns:
             True если файл сохранен успешно
         """
+        # Содержимое собирается заранее и записывается одним вызовом
+        payload = ''.join(f"{key}={value}\n" for key, value in kwargs.items())
         try:
             with open(env_path, 'w', encoding='utf-8') as f:
-                for key, value in kwargs.items():
-                    f.write(f"{key}={value}\n")
+                f.write(payload)
             return True
         except Exception as e:
             print(f"Ошибка при сохранении .env файла: {e}")
@@ -61,18 +94,18 @@ class BotConfig:
         Returns:
             True если конфигурация корректна
         """
-        required_vars = ['TELEGRAM_BOT_TOKEN', 'ADMIN_IDS']
-        
-        for var in required_vars:
-            if not os.getenv(var):
-                print(f"Отсутствует переменная: {var}")
-                return False
+        # Каждая переменная читается из окружения один раз
+        if not os.environ.get('TELEGRAM_BOT_TOKEN'):
+            print("Отсутствует переменная: TELEGRAM_BOT_TOKEN")
+            return False
+        if not os.environ.get('ADMIN_IDS'):
+            print("Отсутствует переменная: ADMIN_IDS")
+            return False
         
-        # Проверяем формат ADMIN_IDS
-        admin_ids_str = os.getenv('ADMIN_IDS', '')
+        # Проверяем формат ADMIN_IDS, разобранный список попадает в кэш
+        # get_admin_ids и переиспользуется следующими вызовами
         try:
-            admin_ids = [int(x.strip()) for x in admin_ids_str.split(',') if x.strip()]
-            if not admin_ids:
+            if not BotConfig.get_admin_ids():
                 print("ADMIN_IDS не содержит корректных ID")
                 return False
         except ValueError:
@@ -89,24 +122,35 @@ class BotConfig:
             Список ID администраторов
         """
         admin_ids_str = os.getenv('ADMIN_IDS', '')
-        return [int(x.strip()) for x in admin_ids_str.split(',') if x.strip()]
+        # os.getenv каждый раз возвращает новую строку, поэтому сравниваем
+        # по значению. Отдаем копию, чтобы вызывающий не испортил кэш
+        if _admin_cache.get('s') == admin_ids_str:
+            return list(_admin_cache['ids'])
+        
+        # int() сам отбрасывает пробелы по краям элемента, а пробел внутри
+        # ("12 34") остается ошибкой, а не склеивается в другой ID
+        ids = list(map(int, filter(str.strip, admin_ids_str.split(','))))
+        _admin_cache['s'] = admin_ids_str
+        _admin_cache['ids'] = ids
+        return list(ids)
     
     @staticmethod
     def print_config_status():
         """Выводит статус конфигурации"""
-        print("СТАТУС КОНФИГУРАЦИИ")
-        print("-" * 30)
+        # Отчет собирается целиком и выводится одной записью
+        out = ["СТАТУС КОНФИГУРАЦИИ\n", "-" * 30 + "\n"]
         
         token = os.getenv('TELEGRAM_BOT_TOKEN')
         if token:
-            print(f"TELEGRAM_BOT_TOKEN: {'*' * 10}...{token[-4:]}")
+            out.append(f"TELEGRAM_BOT_TOKEN: {'*' * 10}...{token[-4:]}\n")
         else:
-            print("TELEGRAM_BOT_TOKEN: НЕ УСТАНОВЛЕН")
+            out.append("TELEGRAM_BOT_TOKEN: НЕ УСТАНОВЛЕН\n")
         
         admin_ids = BotConfig.get_admin_ids()
         if admin_ids:
-            print(f"ADMIN_IDS: {admin_ids}")
+            out.append(f"ADMIN_IDS: {admin_ids}\n")
         else:
-            print("ADMIN_IDS: НЕ УСТАНОВЛЕНЫ")
+            out.append("ADMIN_IDS: НЕ УСТАНОВЛЕНЫ\n")
         
-        print("-" * 30)
+        out.append("-" * 30 + "\n")
+        sys.stdout.write(''.join(out))
@@ -3,84 +3,100 @@
 Скрипт для проверки статуса проекта
 """
 
+import io
 import os
 import sys
-from beer_database import BeerDatabase
+from contextlib import redirect_stdout
+from importlib.metadata import version, PackageNotFoundError
+from beer_database import get_default
 from bot_config import BotConfig
 
+SEP_40 = "=" * 40 + "\n"
+
 def check_project_status():
     """Проверяет статус всех компонентов проекта"""
-    print("ПРОВЕРКА СТАТУСА ПРОЕКТА")
-    print("=" * 40)
+    # Отчет копится в буфере и выводится одной записью в конце
+    buf = io.StringIO()
+    w = buf.write
+    w("ПРОВЕРКА СТАТУСА ПРОЕКТА\n")
+    w(SEP_40)
     
     # Проверка базы данных
-    print("1. База данных:")
+    w("1. База данных:\n")
     try:
-        db = BeerDatabase()
+        db = get_default()
         beers = db.get_all_beers()
-        print(f"   ✅ База данных работает")
-        print(f"   📊 Найдено кранов: {len(beers)}")
+        w("   ✅ База данных работает\n")
+        w(f"   📊 Найдено кранов: {len(beers)}\n")
         
         if beers:
-            print("   📋 Краны:")
+            w("   📋 Краны:\n")
             for beer in beers:
-                id_val, tap_pos, brewery, name, style, price, description, cost = beer
-                print(f"      Кран {tap_pos}: {name} от {brewery} - {price:.0f}₽/л")
+                w(f"      Кран {beer.tap_position}: {beer.name} от {beer.brewery} - "
+                  f"{beer.price_per_liter:.0f}₽/л\n")
     except Exception as e:
-        print(f"   ❌ Ошибка базы данных: {e}")
+        w(f"   ❌ Ошибка базы данных: {e}\n")
     
-    print()
+    w("\n")
     
     # Проверка конфигурации бота
-    print("2. Конфигурация Telegram бота:")
+    w("2. Конфигурация Telegram бота:\n")
     try:
-        if BotConfig.load_env_file():
-            if BotConfig.validate_config():
-                print("   ✅ Конфигурация корректна")
+        # BotConfig сообщает о проблемах через print, направляем их
+        # в тот же буфер, чтобы сохранить порядок строк
+        with redirect_stdout(buf):
+            env_loaded = BotConfig.load_env_file()
+            config_valid = env_loaded and BotConfig.validate_config()
+        if env_loaded:
+            if config_valid:
+                w("   ✅ Конфигурация корректна\n")
                 admin_ids = BotConfig.get_admin_ids()
-                print(f"   👥 Администраторы: {admin_ids}")
+                w(f"   👥 Администраторы: {admin_ids}\n")
             else:
-                print("   ❌ Конфигурация неполная")
-                print("   💡 Запустите: python3 setup_bot.py")
+                w("   ❌ Конфигурация неполная\n")
+                w("   💡 Запустите: python3 setup_bot.py\n")
         else:
-            print("   ❌ Файл .env не найден")
-            print("   💡 Запустите: python3 setup_bot.py")
+            w("   ❌ Файл .env не найден\n")
+            w("   💡 Запустите: python3 setup_bot.py\n")
     except Exception as e:
-        print(f"   ❌ Ошибка конфигурации: {e}")
+        w(f"   ❌ Ошибка конфигурации: {e}\n")
     
-    print()
+    w("\n")
     
     # Проверка зависимостей
-    print("3. Зависимости:")
+    w("3. Зависимости:\n")
+    # Версия берется из метаданных установленного пакета без импорта
+    # самого telegram вместе с httpx и asyncio
     try:
-        import telegram
-        print(f"   ✅ python-telegram-bot: {telegram.__version__}")
-    except ImportError:
-        print("   ❌ python-telegram-bot не установлен")
-        print("   💡 Запустите: pip install -r requirements.txt")
+        w(f"   ✅ python-telegram-bot: {version('python-telegram-bot')}\n")
+    except PackageNotFoundError:
+        w("   ❌ python-telegram-bot не установлен\n")
+        w("   💡 Запустите: pip install -r requirements.txt\n")
     
     try:
         import sqlite3
-        print(f"   ✅ sqlite3: встроенная библиотека")
+        w("   ✅ sqlite3: встроенная библиотека\n")
     except ImportError:
-        print("   ❌ sqlite3 недоступен")
+        w("   ❌ sqlite3 недоступен\n")
     
-    print()
+    w("\n")
     
     # Инструкции по запуску
-    print("4. Инструкции по запуску:")
-    print("   📱 Консольное приложение:")
-    print("      python3 main.py")
-    print()
-    print("   🤖 Telegram бот:")
-    print("      python3 run_bot.py")
-    print()
-    print("   ⚙️ Настройка бота:")
-    print("      python3 setup_bot.py")
+    w("4. Инструкции по запуску:\n")
+    w("   📱 Консольное приложение:\n")
+    w("      python3 main.py\n")
+    w("\n")
+    w("   🤖 Telegram бот:\n")
+    w("      python3 run_bot.py\n")
+    w("\n")
+    w("   ⚙️ Настройка бота:\n")
+    w("      python3 setup_bot.py\n")
+    
+    w("\n")
+    w(SEP_40)
+    w("Проверка завершена!\n")
     
-    print()
-    print("=" * 40)
-    print("Проверка завершена!")
+    sys.stdout.write(buf.getvalue())
 
 if __name__ == "__main__":
     check_project_status()
@@ -3,43 +3,53 @@
 Основное приложение для управления пивными кранами
 """
 
-from beer_database import BeerDatabase
+from beer_database import BeerDatabase, get_default
 import sys
 
+SEP_80 = "-" * 80
+SEP_50 = "=" * 50
+SEP_30 = "-" * 30
+
+MENU = f"""
+{SEP_50}
+УПРАВЛЕНИЕ ПИВНЫМИ КРАНАМИ
+{SEP_50}
+1. Показать все краны
+2. Найти пиво по номеру крана
+3. Добавить новое пиво
+4. Обновить информацию о пиве
+5. Удалить пиво из крана
+6. Показать статистику
+0. Выход
+{SEP_50}
+"""
+
 def print_menu():
     """Выводит меню приложения"""
-    print("\n" + "="*50)
-    print("УПРАВЛЕНИЕ ПИВНЫМИ КРАНАМИ")
-    print("="*50)
-    print("1. Показать все краны")
-    print("2. Найти пиво по номеру крана")
-    print("3. Добавить новое пиво")
-    print("4. Обновить информацию о пиве")
-    print("5. Удалить пиво из крана")
-    print("6. Показать статистику")
-    print("0. Выход")
-    print("="*50)
+    # Меню собрано заранее и уходит одной записью
+    sys.stdout.write(MENU)
 
 def show_all_taps(db: BeerDatabase):
     """Показывает все краны"""
-    beers = db.get_all_beers()
+    # Собираем весь вывод и пишем его одним вызовом вместо print на каждую строку
+    lines = []
+    count = 0
+    for beer in db.iter_all_beers():
+        count += 1
+        lines.append(f"Кран {beer.tap_position}: {beer.name} от {beer.brewery}")
+        lines.append(f"  Сорт: {beer.style}")
+        lines.append(f"  Цена: {beer.price_per_liter:.2f} руб/л")
+        lines.append(f"  Стоимость 400мл: {beer.cost_400ml:.2f} руб")
+        lines.append(f"  Стоимость 250мл: {beer.cost_250ml:.2f} руб")
+        if beer.description:
+            lines.append(f"  Описание: {beer.description}")
+        lines.append(SEP_80)
     
-    if not beers:
+    if not count:
         print("Краны пусты")
         return
     
-    print(f"\nНайдено кранов: {len(beers)}")
-    print("-" * 80)
-    
-    for beer in beers:
-        id_val, tap_pos, brewery, name, style, price, description, cost = beer
-        print(f"Кран {tap_pos}: {name} от {brewery}")
-        print(f"  Сорт: {style}")
-        print(f"  Цена: {price:.2f} руб/л")
-        print(f"  Стоимость: {cost:.2f} руб")
-        if description:
-            print(f"  Описание: {description}")
-        print("-" * 80)
+    sys.stdout.write(f"\nНайдено кранов: {count}\n{SEP_80}\n" + "\n".join(lines) + "\n")
 
 def find_beer_by_tap(db: BeerDatabase):
     """Находит пиво по номеру крана"""
@@ -48,13 +58,16 @@ def find_beer_by_tap(db: BeerDatabase):
         beer = db.get_beer_by_tap(tap_position)
         
         if beer:
-            id_val, tap_pos, brewery, name, style, price, description, cost = beer
-            print(f"\nКран {tap_pos}: {name} от {brewery}")
-            print(f"Сорт: {style}")
-            print(f"Цена: {price:.2f} руб/л")
-            print(f"Стоимость: {cost:.2f} руб")
-            if description:
-                print(f"Описание: {description}")
+            lines = [
+                f"\nКран {beer.tap_position}: {beer.name} от {beer.brewery}",
+                f"Сорт: {beer.style}",
+                f"Цена: {beer.price_per_liter:.2f} руб/л",
+                f"Стоимость 400мл: {beer.cost_400ml:.2f} руб",
+                f"Стоимость 250мл: {beer.cost_250ml:.2f} руб",
+            ]
+            if beer.description:
+                lines.append(f"Описание: {beer.description}")
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
             print(f"Кран {tap_position} не найден")
             
@@ -70,9 +83,11 @@ def add_new_beer(db: BeerDatabase):
         style = input("Сорт пива: ")
         price_per_liter = float(input("Цена за литр: "))
         description = input("Описание (необязательно): ")
-        cost = float(input("Стоимость: "))
+        cost_400ml = float(input("Стоимость 400мл: "))
+        cost_250ml = float(input("Стоимость 250мл: "))
         
-        if db.add_beer(tap_position, brewery, name, style, price_per_liter, description, cost):
+        if db.add_beer(tap_position, brewery, name, style, price_per_liter, description,
+                       cost_400ml, cost_250ml):
             print("Пиво успешно добавлено!")
         else:
             print("Ошибка при добавлении пива")
@@ -94,13 +109,20 @@ def update_beer(db: BeerDatabase):
             return
         
         print(f"\nТекущая информация о кране {tap_position}:")
-        id_val, tap_pos, brewery, name, style, price, description, cost = beer
+        brewery = beer.brewery
+        name = beer.name
+        style = beer.style
+        price = beer.price_per_liter
+        description = beer.description
+        cost_400ml = beer.cost_400ml
+        cost_250ml = beer.cost_250ml
         print(f"Пивоварня: {brewery}")
         print(f"Название: {name}")
         print(f"Сорт: {style}")
         print(f"Цена: {price:.2f} руб/л")
         print(f"Описание: {description}")
-        print(f"Стоимость: {cost:.2f} руб")
+        print(f"Стоимость 400мл: {cost_400ml:.2f} руб")
+        print(f"Стоимость 250мл: {cost_250ml:.2f} руб")
         
         print("\nВведите новые данные (оставьте пустым для сохранения текущего значения):")
         
@@ -109,7 +131,8 @@ def update_beer(db: BeerDatabase):
         new_style = input(f"Сорт [{style}]: ").strip()
         new_price_input = input(f"Цена за литр [{price:.2f}]: ").strip()
         new_description = input(f"Описание [{description}]: ").strip()
-        new_cost_input = input(f"Стоимость [{cost:.2f}]: ").strip()
+        new_cost_400ml_input = input(f"Стоимость 400мл [{cost_400ml:.2f}]: ").strip()
+        new_cost_250ml_input = input(f"Стоимость 250мл [{cost_250ml:.2f}]: ").strip()
         
         # Обрабатываем введенные данные
         update_data = {}
@@ -124,8 +147,10 @@ def update_beer(db: BeerDatabase):
             update_data['price_per_liter'] = float(new_price_input)
         if new_description:
             update_data['description'] = new_description
-        if new_cost_input:
-            update_data['cost'] = float(new_cost_input)
+        if new_cost_400ml_input:
+            update_data['cost_400ml'] = float(new_cost_400ml_input)
+        if new_cost_250ml_input:
+            update_data['cost_250ml'] = float(new_cost_250ml_input)
         
         if db.update_beer(tap_position, **update_data):
             print("Информация о пиве успешно обновлена!")
@@ -145,12 +170,11 @@ def delete_beer(db: BeerDatabase):
         # Показываем информацию о кране перед удалением
         beer = db.get_beer_by_tap(tap_position)
         if beer:
-            id_val, tap_pos, brewery, name, style, price, description, cost = beer
             print(f"\nИнформация о кране {tap_position}:")
-            print(f"Пивоварня: {brewery}")
-            print(f"Название: {name}")
-            print(f"Сорт: {style}")
-            print(f"Цена: {price:.2f} руб/л")
+            print(f"Пивоварня: {beer.brewery}")
+            print(f"Название: {beer.name}")
+            print(f"Сорт: {beer.style}")
+            print(f"Цена: {beer.price_per_liter:.2f} руб/л")
             
             confirm = input("\nВы уверены, что хотите удалить это пиво? (да/нет): ").lower()
             if confirm in ['да', 'yes', 'y']:
@@ -176,51 +200,84 @@ def show_statistics(db: BeerDatabase):
         print("Краны пусты")
         return
     
-    print(f"\nСТАТИСТИКА")
-    print("-" * 30)
-    print(f"Общее количество кранов: {len(beers)}")
-    
-    # Статистика по сортам
+    # Сорта, пивоварни и суммы собираются за один проход.
+    # Методы get привязаны к локальным именам вне цикла
     styles = {}
     breweries = {}
-    total_price = 0
-    total_cost = 0
-    
+    total_price = total_cost = 0.0
+    styles_get = styles.get
+    breweries_get = breweries.get
     for beer in beers:
-        id_val, tap_pos, brewery, name, style, price, description, cost = beer
-        
-        # Подсчет сортов
-        if style in styles:
-            styles[style] += 1
-        else:
-            styles[style] = 1
-        
-        # Подсчет пивоварен
-        if brewery in breweries:
-            breweries[brewery] += 1
-        else:
-            breweries[brewery] = 1
-        
-        total_price += price
-        total_cost += cost
+        style = beer.style
+        brewery = beer.brewery
+        styles[style] = styles_get(style, 0) + 1
+        breweries[brewery] = breweries_get(brewery, 0) + 1
+        total_price += beer.price_per_liter
+        total_cost += beer.cost_400ml
+    
+    # Весь отчет выводится одной записью
+    lines = [
+        "\nСТАТИСТИКА",
+        SEP_30,
+        f"Общее количество кранов: {len(beers)}",
+        f"Средняя цена за литр: {total_price / len(beers):.2f} руб",
+        f"Средняя стоимость 400мл: {total_cost / len(beers):.2f} руб",
+        "\nСорта пива:",
+    ]
+    lines.extend(f"  {style}: {count} кранов" for style, count in sorted(styles.items()))
+    lines.append("\nПивоварни:")
+    lines.extend(f"  {brewery}: {count} кранов" for brewery, count in sorted(breweries.items()))
     
-    print(f"Средняя цена за литр: {total_price / len(beers):.2f} руб")
-    print(f"Средняя стоимость: {total_cost / len(beers):.2f} руб")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+def scripted_input(lines):
+    """Создает замену input(), отдающую заранее прочитанные строки
+    
+    Args:
+        lines: Строки ввода
+        
+    Returns:
+        Функция с интерфейсом input(): печатает подсказку и возвращает
+        следующую строку, по окончании строк бросает EOFError
+    """
+    next_line = iter(lines).__next__
+    write = sys.stdout.write
     
-    print(f"\nСорта пива:")
-    for style, count in sorted(styles.items()):
-        print(f"  {style}: {count} кранов")
+    def read_line(prompt=""):
+        write(prompt)
+        try:
+            return next_line()
+        except StopIteration:
+            raise EOFError from None
     
-    print(f"\nПивоварни:")
-    for brewery, count in sorted(breweries.items()):
-        print(f"  {brewery}: {count} кранов")
+    return read_line
+
+# Пункты меню: номер -> обработчик
+ACTIONS = {
+    "1": show_all_taps,
+    "2": find_beer_by_tap,
+    "3": add_new_beer,
+    "4": update_beer,
+    "5": delete_beer,
+    "6": show_statistics,
+}
 
 def main():
     """Основная функция приложения"""
+    # Без построчной буферизации вывод копится до ближайшего input(),
+    # который сам сбрасывает stdout перед чтением
+    sys.stdout.reconfigure(line_buffering=False, write_through=False)
+    
+    # При вводе из файла или конвейера читаем его целиком одним вызовом,
+    # а input() во всех обработчиках подменяем на выдачу готовых строк
+    if not sys.stdin.isatty():
+        global input
+        input = scripted_input(sys.stdin.read().splitlines())
+    
     print("Запуск приложения управления пивными кранами...")
     
     # Инициализация базы данных
-    db = BeerDatabase()
+    db = get_default()
     
     while True:
         print_menu()
@@ -231,24 +288,19 @@ def main():
             if choice == "0":
                 print("До свидания!")
                 break
-            elif choice == "1":
-                show_all_taps(db)
-            elif choice == "2":
-                find_beer_by_tap(db)
-            elif choice == "3":
-                add_new_beer(db)
-            elif choice == "4":
-                update_beer(db)
-            elif choice == "5":
-                delete_beer(db)
-            elif choice == "6":
-                show_statistics(db)
+            
+            action = ACTIONS.get(choice)
+            if action:
+                action(db)
             else:
                 print("Неверный выбор. Попробуйте снова.")
                 
         except KeyboardInterrupt:
             print("\n\nПрограмма прервана пользователем")
             break
+        except EOFError:
+            print("\nВвод завершен")
+            break
         except Exception as e:
             print(f"Произошла ошибка: {e}")
 
@@ -5,10 +5,29 @@
 
 import os
 import sys
+import functools
 from bot_config import BotConfig
 
-def main():
-    """Основная функция запуска бота"""
+@functools.cache
+def _load_admins() -> tuple:
+    """Разбирает ADMIN_IDS один раз за процесс
+    
+    Повторные вызовы main() в том же процессе (перезапуск под
+    супервизором, тесты) получают готовый результат.
+    
+    Returns:
+        Кортеж ID администраторов
+    """
+    return tuple(BotConfig.get_admin_ids())
+
+def main(bot_class=None):
+    """Основная функция запуска бота
+    
+    Args:
+        bot_class: Класс бота, если модуль telegram_bot уже импортирован
+                   вызывающим кодом. По умолчанию импортируется здесь
+                   после проверки конфигурации
+    """
     print("TELEGRAM BOT ДЛЯ УПРАВЛЕНИЯ ПИВНЫМИ КРАНАМИ")
     print("=" * 50)
     
@@ -32,7 +51,7 @@ def main():
         return 1
     
     # ID администраторов
-    admin_ids = BotConfig.get_admin_ids()
+    admin_ids = _load_admins()
     if not admin_ids:
         print("Ошибка: Не установлены ADMIN_IDS")
         print("Запустите: python3 setup_bot.py для настройки")
@@ -40,12 +59,13 @@ def main():
     
     try:
         # Импортируем и запускаем бота
-        from telegram_bot import BeerBot
+        if bot_class is None:
+            from telegram_bot import BeerBot as bot_class
         
         print("Конфигурация загружена успешно")
         print("Запуск бота...")
         
-        bot = BeerBot(token, admin_ids)
+        bot = bot_class(token, admin_ids)
         bot.run()
         
     except ImportError as e:
@@ -3,14 +3,21 @@
 Telegram бот для управления пивными кранами
 """
 
-import os
+import sys
+import asyncio
+import functools
 import logging
-import requests
+import time
 import re
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+import lxml.etree
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 from urllib.parse import quote
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes, ConversationHandler
-from beer_database import BeerDatabase
+from beer_database import get_default
 
 # Настройка логирования
 logging.basicConfig(
@@ -24,11 +31,108 @@ ADDING_TAP, ADDING_BREWERY, SELECTING_BEER_VARIANT, ADDING_NAME, ADDING_STYLE, A
 EDITING_TAP, EDITING_FIELD, EDITING_VALUE = range(3)
 DELETING_TAP = 0
 
+# Команды бота: имя команды -> имя метода-обработчика BeerBot.
+# Админские /add, /update, /delete убраны - используйте интерфейс с кнопками
+COMMANDS = (
+    ("start", "start_command"),
+    ("help", "help_command"),
+    ("taps", "show_taps_command"),
+    ("find", "find_beer_command"),
+    ("admin", "admin_command"),
+    ("history", "history_command"),
+)
+
+# Обработчики inline-кнопок: данные кнопки или их префикс -> имя метода BeerBot
+CALLBACK_ACTIONS = {
+    "add_beer": "_cb_add_beer",
+    "update_beer": "_cb_update_beer",
+    "delete_beer": "_cb_delete_beer",
+    "show_taps": "_cb_show_taps",
+    "edit_tap_": "_cb_edit_tap",
+    "show_history": "_cb_show_history",
+    "history_info_": "_cb_history_info",
+    "delete_history_": "_cb_delete_history",
+    "clear_all_history": "_cb_clear_all_history",
+    "confirm_clear_history": "_cb_confirm_clear_history",
+    "back_to_history": "_cb_back_to_history",
+    "delete_tap_": "_cb_delete_tap",
+    "confirm_delete_": "_cb_confirm_delete",
+    "edit_field_": "_cb_edit_field",
+    "cancel": "_cb_cancel",
+    "back_to_main": "_cb_back_to_main",
+}
+
+# Кнопки меню, которые всегда работают, независимо от состояния разговора
+MENU_BUTTONS = frozenset({"Краны", "Поиск", "Добавить", "Редактировать", "Удалить", "История"})
+
+# Кнопки выбора крана строятся один раз, индекс списка совпадает с номером крана
+TAP_BUTTONS = [None] + [
+    InlineKeyboardButton(f"Кран {i}", callback_data=f"select_tap_{i}") for i in range(1, 22)  # Максимум 21 кран
+]
+
+# Заголовки и параметры общего HTTP-клиента для запросов к Untappd
+UNTAPPD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+# Регулярные выражения для разбора Untappd компилируются один раз
+_HREF_RE = re.compile(r'href="(/b/([^"]+)/(\d+))"')
+_ABV_RE = re.compile(r'(\d+\.?\d*)\s*%\s*ABV', re.IGNORECASE)
+_IBU_RE = re.compile(r'(\d+\.?\d*)\s*IBU', re.IGNORECASE)
+
+# Элементы страницы пива, после разбора которых загрузку можно прекращать:
+# название (h1) и блоки стиля, ABV, IBU и описания
+_DETAIL_CLASSES = frozenset({'style', 'abv', 'ibu', 'beer-descrption-read-less'})
+_DETAIL_PARTS = len(_DETAIL_CLASSES) + 1
+
+
+def _has_class(name: str) -> str:
+    """XPath-условие: у элемента есть класс name (среди нескольких классов)"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# XPath-запросы к странице пива: текст только самих элементов, без
+# вложенных ссылок вроде "Show Less"
+_XPATH_STATS = f'//p[{_has_class("abv")} or {_has_class("ibu")}]/text()'
+_XPATH_DESC = f'//div[{_has_class("beer-descrption-read-less")}]/text()'
+_XPATH_DESC_FALLBACK = f'//div[{_has_class("beer-desc")}]/text()'
+_XPATH_STYLE = f'//p[{_has_class("style")}]/text()'
+
+# Кэш ответов Untappd: результаты поиска живут час, детали пива - сутки.
+# Пустые ответы (ошибки сети, не 200) не кэшируются
+_SEARCH_CACHE = TTLCache(maxsize=512, ttl=3600)
+_DETAILS_CACHE = TTLCache(maxsize=512, ttl=86400)
+
+# Загрузки деталей пива в процессе: адрес -> задача. Предзагрузка и выбор
+# пива пользователем ждут одну и ту же загрузку, а не скачивают страницу дважды
+_DETAILS_INFLIGHT = {}
+
+# Не больше стольких одновременных предзагрузок деталей с Untappd
+UNTAPPD_PREFETCH_LIMIT = 5
+
+# Время жизни кэша списка кранов в секундах. Записи через бота сбрасывают
+# кэш сразу, TTL нужен для изменений из консольного приложения
+BEERS_CACHE_TTL = 60
+
+# Время жизни кэша отдельных кранов для поиска по номеру, в секундах
+TAP_CACHE_TTL = 30
 
-def search_untappd_beers(brewery: str, beer_name: str = "", style: str = "") -> list:
+# Максимальная длина одного сообщения, отправляемого ботом
+# (лимит Telegram - 4096 символов)
+MESSAGE_LIMIT = 4000
+
+# Не больше стольких правок сообщений в секунду (общий лимит Telegram
+# для бота - около 30 сообщений в секунду)
+EDIT_RATE_LIMIT = 30
+
+
+async def search_untappd_beers(session: aiohttp.ClientSession, brewery: str,
+                               beer_name: str = "", style: str = "") -> list:
     """Ищет варианты пива на Untappd с разными уровнями поиска
     
     Args:
+        session: Общая HTTP-сессия бота
         brewery: Название пивоварни
         beer_name: Название пива (опционально)
         style: Стиль пива (опционально)
@@ -36,6 +140,11 @@ def search_untappd_beers(brewery: str, beer_name: str = "", style: str = "") ->
     Returns:
         Список словарей с найденными вариантами [{name, url, slug}]
     """
+    key = (brewery.lower().strip(), beer_name.lower().strip(), style.lower().strip())
+    cached = _SEARCH_CACHE.get(key)
+    if cached is not None:
+        return list(cached)
+    
     try:
         # Формируем поисковый запрос в зависимости от заполненных полей
         if beer_name:
@@ -47,19 +156,17 @@ def search_untappd_beers(brewery: str, beer_name: str = "", style: str = "") ->
             
         search_url = f"https://untappd.com/search?q={quote(query)}"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(search_url, headers=headers, timeout=5)
+        async with session.get(search_url) as response:
+            if response.status != 200:
+                return []
+            html = await response.text()
         
-        if response.status_code == 200:
-            # Ищем все ссылки на пиво в результатах (до 5 штук)
-            matches = re.findall(r'href="(/b/([^"]+)/(\d+))"', response.text)
+        if html:
+            # Ищем ссылки на пиво в результатах, останавливаемся на пятой
             results = []
             
-            for match in matches[:5]:
-                beer_path = match[0]
-                beer_slug = match[1]
+            for match in _HREF_RE.finditer(html):
+                beer_path, beer_slug = match.group(1, 2)
                 
                 # Форматируем название из slug
                 beer_display = beer_slug.replace('-', ' ').title()
@@ -69,8 +176,12 @@ def search_untappd_beers(brewery: str, beer_name: str = "", style: str = "") ->
                     'name': beer_display,
                     'slug': beer_slug
                 })
+                if len(results) == 5:
+                    break
             
-            return results
+            if results:
+                _SEARCH_CACHE[key] = results
+            return list(results)
         
         return []
         
@@ -79,55 +190,102 @@ def search_untappd_beers(brewery: str, beer_name: str = "", style: str = "") ->
         return []
 
 
-def get_beer_details(beer_url: str) -> dict:
+async def get_beer_details(session: aiohttp.ClientSession, beer_url: str) -> dict:
     """Получает детальную информацию о пиве со страницы Untappd
     
     Args:
+        session: Общая HTTP-сессия бота
         beer_url: URL страницы пива на Untappd
         
     Returns:
         Словарь с данными {abv, ibu, description, style, name}
     """
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(beer_url, headers=headers, timeout=5)
+    cached = _DETAILS_CACHE.get(beer_url)
+    if cached is not None:
+        return dict(cached)
+    
+    task = _DETAILS_INFLIGHT.get(beer_url)
+    if task is None:
+        task = asyncio.ensure_future(_load_beer_details(session, beer_url))
+        _DETAILS_INFLIGHT[beer_url] = task
+        task.add_done_callback(lambda _: _DETAILS_INFLIGHT.pop(beer_url, None))
+    # shield: отмена одного ожидающего не прерывает загрузку для остальных
+    return dict(await asyncio.shield(task))
+
+
+async def _load_beer_details(session: aiohttp.ClientSession, beer_url: str) -> dict:
+    """Загружает и разбирает страницу пива, результат кладет в кэш
+    
+    Args:
+        session: Общая HTTP-сессия бота
+        beer_url: URL страницы пива на Untappd
         
-        if response.status_code == 200:
-            html = response.text
+    Returns:
+        Словарь с данными, пустой при ошибке
+    """
+    try:
+        # Страница разбирается по мере загрузки. Все нужные поля находятся
+        # в начале страницы, поэтому чтение останавливается, как только
+        # закрыты все нужные элементы, а остаток страницы не скачивается
+        async with session.get(beer_url) as response:
+            if response.status != 200:
+                return {}
+            parser = lxml.etree.HTMLPullParser(events=('end',),
+                                               encoding=response.charset or 'utf-8')
+            found = set()
+            async for chunk in response.content.iter_chunked(8192):
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag == 'h1':
+                        found.add('h1')
+                    else:
+                        classes = element.get('class')
+                        if classes:
+                            found.update(_DETAIL_CLASSES.intersection(classes.split()))
+                if len(found) == _DETAIL_PARTS:
+                    break
+            doc = parser.close()
+        
+        if doc is not None:
             details = {}
             
+            # ABV и IBU ищем в коротких текстовых узлах блока с
+            # характеристиками, а не во всем HTML
+            stats = " ".join(doc.xpath(_XPATH_STATS))
+            if not stats:
+                stats = "".join(doc.itertext())
+            
             # Парсим ABV (алкоголь)
-            abv_match = re.search(r'(\d+\.?\d*)\s*%\s*ABV', html, re.IGNORECASE)
+            abv_match = _ABV_RE.search(stats)
             if abv_match:
                 details['abv'] = float(abv_match.group(1))
             
             # Парсим IBU (горечь)
-            ibu_match = re.search(r'(\d+\.?\d*)\s*IBU', html, re.IGNORECASE)
+            ibu_match = _IBU_RE.search(stats)
             if ibu_match:
                 details['ibu'] = float(ibu_match.group(1))
             
             # Парсим описание
-            desc_match = re.search(r'<div class="beer-descrption-read-less">([^<]+)</div>', html)
-            if not desc_match:
-                desc_match = re.search(r'<div class="beer-desc">([^<]+)</div>', html)
-            if desc_match:
-                description = desc_match.group(1).strip()
-                # Очищаем от лишних пробелов
-                description = re.sub(r'\s+', ' ', description)
+            desc_nodes = doc.xpath(_XPATH_DESC)
+            if not desc_nodes:
+                desc_nodes = doc.xpath(_XPATH_DESC_FALLBACK)
+            # Очищаем от лишних пробелов
+            description = " ".join("".join(desc_nodes).split())
+            if description:
                 details['description'] = description
             
             # Парсим стиль
-            style_match = re.search(r'<p class="style">([^<]+)</p>', html)
-            if style_match:
-                details['style'] = style_match.group(1).strip()
+            style_nodes = doc.xpath(_XPATH_STYLE)
+            if style_nodes and style_nodes[0].strip():
+                details['style'] = style_nodes[0].strip()
             
             # Парсим название пива
-            name_match = re.search(r'<h1>([^<]+)</h1>', html)
-            if name_match:
-                details['name'] = name_match.group(1).strip()
+            name_nodes = doc.xpath('//h1/text()')[:1]
+            if name_nodes and name_nodes[0].strip():
+                details['name'] = name_nodes[0].strip()
             
+            if details:
+                _DETAILS_CACHE[beer_url] = details
             return details
         
         return {}
@@ -137,6 +295,115 @@ def get_beer_details(beer_url: str) -> dict:
         return {}
 
 
+async def prefetch_beer_details(session: aiohttp.ClientSession, urls: list,
+                                limit: asyncio.Semaphore) -> list:
+    """Параллельно загружает детали нескольких пив с Untappd
+    
+    Результаты попадают в кэш деталей, поэтому последующий
+    get_beer_details для этих адресов не идет в сеть.
+    
+    Args:
+        session: Общая HTTP-сессия бота
+        urls: Адреса страниц пива на Untappd
+        limit: Семафор, ограничивающий число одновременных загрузок
+        
+    Returns:
+        Список словарей с данными в порядке адресов
+    """
+    async def fetch(url: str) -> dict:
+        async with limit:
+            return await get_beer_details(session, url)
+    
+    return await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+
+
+def split_message(blocks: list, limit: int = MESSAGE_LIMIT) -> list:
+    """Собирает блоки текста в сообщения не длиннее limit
+    
+    Блоки не разрываются между сообщениями. Только блок, который сам
+    длиннее limit, режется на части.
+    
+    Args:
+        blocks: Блоки текста в порядке вывода
+        limit: Максимальная длина сообщения
+        
+    Returns:
+        Список текстов сообщений
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    for block in blocks:
+        if current_len + len(block) > limit and current:
+            chunks.append("".join(current))
+            current = []
+            current_len = 0
+        if len(block) > limit:
+            chunks.extend(block[i:i + limit] for i in range(0, len(block), limit))
+            continue
+        current.append(block)
+        current_len += len(block)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+@functools.lru_cache(maxsize=8)
+def _build_history_markup(history: tuple, clear_text: str = "Очистить всю историю",
+                          back: bool = False) -> InlineKeyboardMarkup:
+    """Строит клавиатуру списка истории пива
+    
+    Результат кэшируется по содержимому истории: пока записи не
+    изменились, кнопки повторно не создаются.
+    
+    Args:
+        history: Записи истории (кортеж HistoryRow)
+        clear_text: Текст кнопки очистки истории
+        back: Добавить кнопку возврата в главное меню
+        
+    Returns:
+        Клавиатура с кнопками записей истории
+    """
+    keyboard = []
+    for beer in history:
+        button_text = f"{beer.brewery} - {beer.name} (×{beer.added_count})"
+        if len(button_text) > 60:
+            button_text = button_text[:57] + "..."
+        keyboard.append([
+            InlineKeyboardButton(
+                button_text,
+                callback_data=f"history_info_{beer.id}"
+            )
+        ])
+    
+    # Кнопка очистки всей истории
+    keyboard.append([
+        InlineKeyboardButton(clear_text, callback_data="clear_all_history")
+    ])
+    if back:
+        keyboard.append([
+            InlineKeyboardButton("Назад", callback_data="back_to_main")
+        ])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def require_admin(handler):
+    """Декоратор обработчиков команд, доступных только администраторам
+    
+    Проверяет отправителя до вызова обработчика и отвечает отказом,
+    если у него нет прав администратора.
+    """
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not self.is_admin(update.effective_user.id):
+            await update.message.reply_text("У вас нет прав администратора")
+            return
+        return await handler(self, update, context)
+    
+    return wrapper
+
+
 class BeerBot:
     """Класс Telegram бота для управления пивными кранами"""
     
@@ -148,8 +415,110 @@ class BeerBot:
             admin_ids: Список ID администраторов
         """
         self.token = token
-        self.admin_ids = admin_ids
-        self.db = BeerDatabase()
+        # Множество для проверки прав за O(1) в is_admin
+        self.admin_ids = frozenset(admin_ids)
+        self.db = get_default()
+        # Запросы к базе выполняются в пуле потоков, чтобы не блокировать
+        # цикл событий. Соединение общее (check_same_thread=False) и
+        # защищено блокировкой внутри BeerDatabase
+        self._db_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="beer-db")
+        
+        # Кэш get_all_beers: действителен, пока не изменилось поколение
+        # записей и не истек BEERS_CACHE_TTL
+        self._beers_gen = 0
+        self._beers_cache = None
+        self._beers_cache_gen = -1
+        self._beers_cache_time = 0.0
+        # Найденные краны по номеру, сбрасывается вместе с кэшем списка
+        self._tap_cache = TTLCache(maxsize=32, ttl=TAP_CACHE_TTL)
+        # История меняется только через бота: лимит -> список записей,
+        # сбрасывается при каждом изменении истории
+        self._history_cache = {}
+        self._history_gen = 0
+        # Запросы к базе в процессе выполнения: ключ -> задача. Параллельные
+        # обработчики с одинаковым ключом ждут одну задачу, а не дублируют запрос
+        self._inflight = {}
+        
+        # Очередь правок сообщений: ключ сообщения -> (последняя правка,
+        # future ее отправки). Повторные правки одного сообщения до отправки
+        # заменяют предыдущую. Отправляемые правки: ключ -> задача
+        self._send_queue = asyncio.Queue()
+        self._pending_edits = {}
+        self._sending = {}
+        self._edit_limiter = AsyncLimiter(EDIT_RATE_LIMIT, 1)
+        self._send_task = None
+        
+        # Клавиатуры меню не меняются, поэтому создаются один раз:
+        # начальная с "Пивные краны", полная для администраторов и
+        # основная для обычных пользователей
+        self._welcome_markup = ReplyKeyboardMarkup(
+            [[KeyboardButton("Пивные краны")]],
+            resize_keyboard=True,
+            one_time_keyboard=False,
+            input_field_placeholder="Выберите действие..."
+        )
+        self._full_admin_markup = ReplyKeyboardMarkup(
+            [
+                [KeyboardButton("Краны"), KeyboardButton("Поиск")],
+                [KeyboardButton("Добавить"), KeyboardButton("Редактировать")],
+                [KeyboardButton("Удалить"), KeyboardButton("История")]
+            ],
+            resize_keyboard=True
+        )
+        self._user_markup = ReplyKeyboardMarkup(
+            [[KeyboardButton("Краны"), KeyboardButton("Поиск")]],
+            resize_keyboard=True
+        )
+        
+        # Неизменяемые inline-клавиатуры: панель администратора,
+        # главное меню, подтверждение очистки истории и кнопка "Назад"
+        self._admin_panel_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("Краны", callback_data="show_taps"),
+                InlineKeyboardButton("Поиск", callback_data="search_beer")
+            ],
+            [
+                InlineKeyboardButton("Добавить", callback_data="add_beer"),
+                InlineKeyboardButton("Редактировать", callback_data="update_beer")
+            ],
+            [
+                InlineKeyboardButton("Удалить", callback_data="delete_beer"),
+                InlineKeyboardButton("История", callback_data="show_history")
+            ]
+        ])
+        self._main_admin_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("Краны", callback_data="show_taps"),
+                InlineKeyboardButton("Поиск", callback_data="search_beer")
+            ],
+            [
+                InlineKeyboardButton("Добавить", callback_data="add_beer"),
+                InlineKeyboardButton("Редактировать", callback_data="update_beer")
+            ],
+            [
+                InlineKeyboardButton("Удалить", callback_data="delete_beer")
+            ]
+        ])
+        self._main_user_markup = InlineKeyboardMarkup([
+            [
+                InlineKeyboardButton("Все краны", callback_data="show_taps"),
+                InlineKeyboardButton("Поиск", callback_data="search_beer")
+            ],
+            [
+                InlineKeyboardButton("Помощь", callback_data="help_info")
+            ]
+        ])
+        self._confirm_clear_history_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Да, очистить", callback_data="confirm_clear_history")],
+            [InlineKeyboardButton("Отмена", callback_data="back_to_history")]
+        ])
+        self._back_to_main_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Назад", callback_data="back_to_main")]
+        ])
+        # HTTP-сессия и семафор предзагрузки создаются в post_init, когда
+        # уже запущен цикл событий приложения
+        self.http = None
+        self._untappd_limit = None
         
         # Создаем приложение
         self.application = Application.builder().token(token).build()
@@ -160,19 +529,10 @@ class BeerBot:
     def setup_handlers(self):
         """Настройка обработчиков команд"""
         
-        # Основные команды
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("taps", self.show_taps_command))
-        self.application.add_handler(CommandHandler("find", self.find_beer_command))
-        
-        # Админские команды
-        self.application.add_handler(CommandHandler("admin", self.admin_command))
-        self.application.add_handler(CommandHandler("history", self.history_command))
-        # Админские команды убраны - используйте интерфейс с кнопками
-        # self.application.add_handler(CommandHandler("add", self.add_beer_command))
-        # self.application.add_handler(CommandHandler("update", self.update_beer_command))
-        # self.application.add_handler(CommandHandler("delete", self.delete_beer_command))
+        # Основные и админские команды
+        self.application.add_handlers([
+            CommandHandler(command, getattr(self, method)) for command, method in COMMANDS
+        ])
         
         # ConversationHandler для добавления пива (ДОЛЖЕН БЫТЬ ВЫШЕ общих обработчиков)
         add_beer_handler = ConversationHandler(
@@ -223,30 +583,243 @@ class BeerBot:
         """
         return user_id in self.admin_ids
     
+    async def _db(self, func, *args):
+        """Выполняет вызов базы данных в пуле потоков
+        
+        Args:
+            func: Метод BeerDatabase
+            *args: Аргументы вызова
+            
+        Returns:
+            Результат вызова
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_pool, func, *args)
+    
+    async def _db_once(self, key, func, *args):
+        """Выполняет чтение из базы, объединяя одинаковые параллельные запросы
+        
+        Блокировка не держится на время запроса: запросы с разными ключами
+        выполняются в пуле параллельно.
+        
+        Args:
+            key: Ключ запроса, включающий поколение данных
+            func: Метод BeerDatabase
+            *args: Аргументы вызова
+            
+        Returns:
+            Результат вызова
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._db(func, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего не отменяет запрос для остальных
+        return await asyncio.shield(task)
+    
+    async def _cached_all_beers(self) -> list:
+        """Возвращает список всех кранов, по возможности из кэша
+        
+        Returns:
+            Список строк с данными о всех пивах
+        """
+        now = time.monotonic()
+        if (self._beers_cache_gen == self._beers_gen
+                and now - self._beers_cache_time <= BEERS_CACHE_TTL):
+            return self._beers_cache
+        # Поколение запоминаем до запроса: запись, прошедшая во время
+        # запроса, сделает результат устаревшим
+        gen = self._beers_gen
+        beers = await self._db_once(("beers", gen), self.db.get_all_beers)
+        if gen == self._beers_gen:
+            self._beers_cache = beers
+            self._beers_cache_gen = gen
+            self._beers_cache_time = now
+        return beers
+    
+    async def _cached_beer_by_tap(self, tap_position: int):
+        """Возвращает пиво по номеру крана, по возможности из кэша
+        
+        Args:
+            tap_position: Номер позиции крана
+            
+        Returns:
+            Строка с данными о пиве или None если не найдено
+        """
+        beer = self._tap_cache.get(tap_position)
+        if beer is None:
+            gen = self._beers_gen
+            beer = await self._db_once(("tap", gen, tap_position), self.db.get_beer_by_tap, tap_position)
+            if beer is not None and gen == self._beers_gen:
+                self._tap_cache[tap_position] = beer
+        return beer
+    
+    def _beers_changed(self):
+        """Отмечает изменение кранов, кэши кранов устаревают"""
+        self._beers_gen += 1
+        self._tap_cache.clear()
+    
+    async def _cached_history(self, limit: int) -> list:
+        """Возвращает историю пива, по возможности из кэша
+        
+        Args:
+            limit: Максимальное количество записей
+            
+        Returns:
+            Список записей истории
+        """
+        history = self._history_cache.get(limit)
+        if history is None:
+            gen = self._history_gen
+            history = await self._db_once(("history", gen, limit), self.db.get_beer_history, limit)
+            if gen == self._history_gen:
+                self._history_cache[limit] = history
+        return history
+    
+    async def _history_snapshot(self, context: ContextTypes.DEFAULT_TYPE) -> list:
+        """Возвращает историю для списка в меню
+        
+        Последний показанный пользователю список хранится в context.user_data
+        вместе с поколением истории и переиспользуется при навигации, пока
+        история не менялась.
+        
+        Args:
+            context: Контекст обработчика
+            
+        Returns:
+            Список записей истории (не более 50)
+        """
+        snapshot = context.user_data.get('history_snapshot')
+        if snapshot and snapshot[0] == self._history_gen:
+            return snapshot[1]
+        gen = self._history_gen
+        history = await self._cached_history(50)
+        context.user_data['history_snapshot'] = (gen, history)
+        return history
+    
+    async def _render_history(self, query, context: ContextTypes.DEFAULT_TYPE, empty_text: str,
+                              empty_markup=None, back: bool = False):
+        """Показывает список истории пива в сообщении с кнопками
+        
+        Args:
+            query: Callback-запрос, сообщение которого редактируется
+            context: Контекст обработчика
+            empty_text: Текст для пустой истории
+            empty_markup: Клавиатура для пустой истории
+            back: Добавить кнопку возврата к главному меню
+        """
+        history = await self._history_snapshot(context)
+        
+        if not history:
+            await self._enqueue_edit(query, empty_text, reply_markup=empty_markup)
+            return
+        
+        reply_markup = _build_history_markup(tuple(history), back=back)
+        await self._enqueue_edit(
+            query,
+            "ИСТОРИЯ ПИВА\n\n"
+            "Нажмите на пиво для просмотра или удаления:",
+            reply_markup=reply_markup
+        )
+    
+    async def _enqueue_edit(self, query, text: str, **kwargs):
+        """Ставит правку сообщения callback-запроса в очередь отправки
+        
+        Args:
+            query: Callback-запрос, сообщение которого редактируется
+            text: Новый текст сообщения
+            **kwargs: Параметры edit_message_text (reply_markup, parse_mode)
+            
+        Returns:
+            Future, которое завершается после отправки правки (или заменившей
+            ее более новой) и несет ошибку, если правка не прошла. Его ждут
+            перед ответами в тот же чат, чтобы правка не пришла после
+            сообщения, отправленного позже
+        """
+        # Обработчик отправки запускается при первой правке и перезапускается,
+        # если завершился, иначе ожидающие отправки зависли бы навсегда
+        if self._send_task is None or self._send_task.done():
+            self._send_task = asyncio.create_task(self._send_worker())
+        
+        if query.message is not None:
+            key = (query.message.chat_id, query.message.message_id)
+        else:
+            key = query.inline_message_id
+        pending = self._pending_edits.get(key)
+        if pending is None:
+            sent = asyncio.get_running_loop().create_future()
+            # Ошибку уже записал _send_edit: если результат никто не ждет,
+            # забираем ее, чтобы asyncio не ругался на непрочитанное исключение
+            sent.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._send_queue.put_nowait(key)
+        else:
+            sent = pending[1]
+        self._pending_edits[key] = (functools.partial(query.edit_message_text, text, **kwargs), sent)
+        return sent
+    
+    async def _send_worker(self):
+        """Запускает отправку правок из очереди с ограничением частоты
+        
+        Каждая правка отправляется отдельной задачей: медленный запрос
+        к Telegram не задерживает правки остальных сообщений.
+        """
+        while True:
+            key = await self._send_queue.get()
+            pending = self._pending_edits.pop(key, None)
+            if pending is None:
+                continue
+            await self._edit_limiter.acquire()
+            task = asyncio.create_task(self._send_edit(*pending, self._sending.get(key)))
+            self._sending[key] = task
+            task.add_done_callback(functools.partial(self._edit_sent, key))
+    
+    async def _send_edit(self, edit, sent, previous):
+        """Отправляет одну правку сообщения
+        
+        Args:
+            edit: Вызов edit_message_text с аргументами
+            sent: Future, завершаемое после отправки
+            previous: Еще не завершенная отправка правки того же сообщения
+        """
+        # Правки одного сообщения уходят по порядку, иначе более старая
+        # могла бы прийти последней
+        if previous is not None:
+            await asyncio.wait((previous,))
+        try:
+            await edit()
+        except Exception as e:
+            logger.error(f"Ошибка при изменении сообщения: {e}")
+            if not sent.done():
+                sent.set_exception(e)
+        finally:
+            if not sent.done():
+                sent.set_result(None)
+    
+    def _edit_sent(self, key, task):
+        """Убирает завершенную отправку правки из списка отправляемых"""
+        if self._sending.get(key) is task:
+            del self._sending[key]
+    
+    def _history_changed(self):
+        """Отмечает изменение истории, кэш истории устаревает"""
+        self._history_gen += 1
+        self._history_cache.clear()
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
         user_id = update.effective_user.id
         is_admin = self.is_admin(user_id)
         
-        # Создаем начальную клавиатуру только с "Пивные краны"
-        keyboard = [
-            [KeyboardButton("Пивные краны")]
-        ]
-        
-        welcome_text = "ПИВНЫЕ КРАНЫ\n\n"
-        welcome_text += "Добро пожаловать!\n"
-        welcome_text += "Нажмите кнопку ниже для просмотра кранов:"
-        
-        reply_markup = ReplyKeyboardMarkup(
-            keyboard, 
-            resize_keyboard=True, 
-            one_time_keyboard=False,
-            input_field_placeholder="Выберите действие..."
+        welcome_text = (
+            "ПИВНЫЕ КРАНЫ\n\n"
+            "Добро пожаловать!\n"
+            "Нажмите кнопку ниже для просмотра кранов:"
         )
         
         await update.message.reply_text(
             welcome_text,
-            reply_markup=reply_markup,
+            reply_markup=self._welcome_markup,
             parse_mode='Markdown'
         )
     
@@ -256,9 +829,6 @@ class BeerBot:
         user_id = update.effective_user.id
         is_admin = self.is_admin(user_id)
         
-        # Кнопки меню всегда работают, независимо от состояния разговора
-        menu_buttons = ["Краны", "Поиск", "Добавить", "Редактировать", "Удалить", "История"]
-        
         # Обрабатываем кнопку "Пивные краны" отдельно
         if text == "Пивные краны":
             # Показываем краны
@@ -266,41 +836,20 @@ class BeerBot:
             
             # Меняем клавиатуру на полное меню для администраторов
             if is_admin:
-                full_keyboard = [
-                    [
-                        KeyboardButton("Краны"),
-                        KeyboardButton("Поиск")
-                    ],
-                    [
-                        KeyboardButton("Добавить"),
-                        KeyboardButton("Редактировать")
-                    ],
-                    [
-                        KeyboardButton("Удалить"),
-                        KeyboardButton("История")
-                    ]
-                ]
-                reply_markup = ReplyKeyboardMarkup(full_keyboard, resize_keyboard=True)
                 await update.message.reply_text(
                     "Меню активировано!",
-                    reply_markup=reply_markup
+                    reply_markup=self._full_admin_markup
                 )
             else:
                 # Для обычных пользователей показываем только основные кнопки
-                user_keyboard = [
-                    [
-                        KeyboardButton("Краны"),
-                        KeyboardButton("Поиск")
-                    ]
-                ]
-                reply_markup = ReplyKeyboardMarkup(user_keyboard, resize_keyboard=True)
                 await update.message.reply_text(
                     "Меню активировано!",
-                    reply_markup=reply_markup
+                    reply_markup=self._user_markup
                 )
             return
         
-        if text in menu_buttons:
+        # Кнопки меню всегда работают, независимо от состояния разговора
+        if text in MENU_BUTTONS:
             # Обрабатываем кнопки меню
             if text == "Краны":
                 await self.show_taps_command(update, context)
@@ -329,36 +878,36 @@ class BeerBot:
             # Обработка поиска
             try:
                 tap_position = int(text)
-                beer = self.db.get_beer_by_tap(tap_position)
+                beer = await self._cached_beer_by_tap(tap_position)
                 
                 if beer:
-                    id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-                    message = f"Кран {tap_pos}:\n"
-                    message += f"Пивоварня: {brewery}\n"
-                    message += f"Название: {name}\n"
-                    message += f"Стиль: {style}\n"
+                    parts = [f"Кран {beer.tap_position}:\n"]
+                    parts.append(f"Пивоварня: {beer.brewery}\n")
+                    parts.append(f"Название: {beer.name}\n")
+                    parts.append(f"Стиль: {beer.style}\n")
                     
                     # Показываем ABV и IBU если есть
-                    if abv:
-                        message += f"Алкоголь: {abv}%\n"
-                    if ibu:
-                        message += f"Горечь: {ibu} IBU\n"
+                    if beer.abv:
+                        parts.append(f"Алкоголь: {beer.abv}%\n")
+                    if beer.ibu:
+                        parts.append(f"Горечь: {beer.ibu} IBU\n")
                     
                     # Ссылка на Untappd отдельной строкой
-                    if untappd_url:
-                        message += f"Untappd: {untappd_url}\n"
+                    if beer.untappd_url:
+                        parts.append(f"Untappd: {beer.untappd_url}\n")
                     
                     # Показываем цену за литр только админам
                     if is_admin:
-                        message += f"Цена: {price:.2f} руб/л\n"
+                        parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
                     
                     # Стоимость показываем всем
-                    message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-                    message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
+                    parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+                    parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n")
                     
-                    if description:
-                        message += f"Описание: {description}"
+                    if beer.description:
+                        parts.append(f"Описание: {beer.description}")
                     
+                    message = "".join(parts)
                     await update.message.reply_text(message, parse_mode='Markdown')
                 else:
                     await update.message.reply_text(f"Кран {tap_position} не найден")
@@ -367,18 +916,17 @@ class BeerBot:
             except ValueError:
                 await update.message.reply_text("Ошибка: Введите корректный номер крана")
         else:
-            # Только если это не команда меню и не поиск
-            if not any(text == cmd for cmd in ["Краны", "Поиск", "Добавить", "Редактировать", "Удалить", "История"]):
-                await update.message.reply_text("Неизвестная команда. Используйте кнопки меню.")
+            # Кнопки меню обработаны выше, сюда доходит только неизвестный текст
+            await update.message.reply_text("Неизвестная команда. Используйте кнопки меню.")
     
     async def show_add_beer_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать меню добавления пива"""
-        # Создаем кнопки для выбора крана
+        # Создаем кнопки для выбора крана, занятые краны берем одним запросом
+        occupied_taps = await self._db(self.db.get_occupied_taps)
         keyboard = []
-        for i in range(1, 22):  # Максимум 21 кран
-            existing_beer = self.db.get_beer_by_tap(i)
-            if not existing_beer:
-                keyboard.append([InlineKeyboardButton(f"Кран {i}", callback_data=f"select_tap_{i}")])
+        for i in range(1, len(TAP_BUTTONS)):
+            if i not in occupied_taps:
+                keyboard.append([TAP_BUTTONS[i]])
         
         if not keyboard:
             await update.message.reply_text("Все краны заняты!")
@@ -394,7 +942,7 @@ class BeerBot:
     
     async def show_edit_beer_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать меню редактирования пива"""
-        beers = self.db.get_all_beers()
+        beers = await self._cached_all_beers()
         
         if not beers:
             await update.message.reply_text("Нет пива для редактирования!")
@@ -402,8 +950,7 @@ class BeerBot:
         
         keyboard = []
         for beer in beers:
-            id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-            keyboard.append([InlineKeyboardButton(f"Кран {tap_pos}: {name}", callback_data=f"edit_tap_{tap_pos}")])
+            keyboard.append([InlineKeyboardButton(f"Кран {beer.tap_position}: {beer.name}", callback_data=f"edit_tap_{beer.tap_position}")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -415,7 +962,7 @@ class BeerBot:
     
     async def show_delete_beer_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать меню удаления пива"""
-        beers = self.db.get_all_beers()
+        beers = await self._cached_all_beers()
         
         if not beers:
             await update.message.reply_text("Нет пива для удаления!")
@@ -423,8 +970,7 @@ class BeerBot:
         
         keyboard = []
         for beer in beers:
-            id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-            keyboard.append([InlineKeyboardButton(f"Кран {tap_pos}: {name}", callback_data=f"delete_tap_{tap_pos}")])
+            keyboard.append([InlineKeyboardButton(f"Кран {beer.tap_position}: {beer.name}", callback_data=f"delete_tap_{beer.tap_position}")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
@@ -439,22 +985,26 @@ class BeerBot:
         user_id = update.effective_user.id
         is_admin = self.is_admin(user_id)
         
-        help_text = "Помощь по командам\n\n"
-        help_text += "Общие команды:\n"
-        help_text += "/taps - показать все краны\n"
-        help_text += "/find <номер> - найти пиво по номеру крана\n\n"
+        parts = [
+            "Помощь по командам\n\n",
+            "Общие команды:\n",
+            "/taps - показать все краны\n",
+            "/find <номер> - найти пиво по номеру крана\n\n",
+        ]
         
         if is_admin:
-            help_text += "Команды администратора:\n"
-            help_text += "/admin - панель администратора\n\n"
-            help_text += "В панели админа доступны:\n"
-            help_text += "- Добавление нового пива в кран\n"
-            help_text += "- Редактирование информации о пиве\n"
-            help_text += "- Удаление пива из крана\n"
-            help_text += "- Просмотр всех кранов\n"
+            parts.append("Команды администратора:\n")
+            parts.append("/admin - панель администратора\n\n")
+            parts.append("В панели админа доступны:\n")
+            parts.append("- Добавление нового пива в кран\n")
+            parts.append("- Редактирование информации о пиве\n")
+            parts.append("- Удаление пива из крана\n")
+            parts.append("- Просмотр всех кранов\n")
         else:
-            help_text += "Для получения прав администратора\n"
-            help_text += "обратитесь к владельцу бота."
+            parts.append("Для получения прав администратора\n")
+            parts.append("обратитесь к владельцу бота.")
+        
+        help_text = ''.join(parts)
         
         await update.message.reply_text(help_text)
     
@@ -463,50 +1013,48 @@ class BeerBot:
         user_id = update.effective_user.id
         is_admin = self.is_admin(user_id)
         
-        beers = self.db.get_all_beers()
+        beers = await self._cached_all_beers()
         
         if not beers:
             await update.message.reply_text("Краны пусты")
             return
         
-        message = "ТЕКУЩИЕ КРАНЫ:\n\n"
+        # Каждый кран - отдельный блок, чтобы при разбиении длинного
+        # списка описание крана не разрывалось между сообщениями
+        blocks = ["ТЕКУЩИЕ КРАНЫ:\n\n"]
         
         for beer in beers:
-            id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-            message += f"Кран {tap_pos}:\n"
-            message += f"Пивоварня: {brewery}\n"
-            message += f"Название: {name}\n"
-            message += f"Стиль: {style}\n"
+            parts = [f"Кран {beer.tap_position}:\n"]
+            parts.append(f"Пивоварня: {beer.brewery}\n")
+            parts.append(f"Название: {beer.name}\n")
+            parts.append(f"Стиль: {beer.style}\n")
             
             # Показываем ABV и IBU если есть
-            if abv:
-                message += f"Алкоголь: {abv}%\n"
-            if ibu:
-                message += f"Горечь: {ibu} IBU\n"
+            if beer.abv:
+                parts.append(f"Алкоголь: {beer.abv}%\n")
+            if beer.ibu:
+                parts.append(f"Горечь: {beer.ibu} IBU\n")
             
             # Ссылка на Untappd отдельной строкой
-            if untappd_url:
-                message += f"Untappd: {untappd_url}\n"
+            if beer.untappd_url:
+                parts.append(f"Untappd: {beer.untappd_url}\n")
             
             # Показываем цену за литр только админам
             if is_admin:
-                message += f"Цена: {price:.2f} руб/л\n"
+                parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
             
             # Стоимость показываем всем
-            message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-            message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
+            parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+            parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n")
             
-            if description:
-                message += f"Описание: {description}\n"
-            message += "\n"
-        
-        # Разбиваем длинные сообщения
-        if len(message) > 4000:
-            chunks = [message[i:i+4000] for i in range(0, len(message), 4000)]
-            for chunk in chunks:
-                await update.message.reply_text(chunk)
-        else:
-            await update.message.reply_text(message)
+            if beer.description:
+                parts.append(f"Описание: {beer.description}\n")
+            parts.append("\n")
+            blocks.append("".join(parts))
+        
+        # Длинный список отправляем несколькими сообщениями по порядку
+        for chunk in split_message(blocks):
+            await update.message.reply_text(chunk)
     
     async def find_beer_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Найти пиво по номеру крана"""
@@ -516,39 +1064,39 @@ class BeerBot:
         
         try:
             tap_position = int(context.args[0])
-            beer = self.db.get_beer_by_tap(tap_position)
+            beer = await self._cached_beer_by_tap(tap_position)
             
             if beer:
-                id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
                 user_id = update.effective_user.id
                 is_admin = self.is_admin(user_id)
                 
-                message = f"Кран {tap_pos}:\n"
-                message += f"Пивоварня: {brewery}\n"
-                message += f"Название: {name}\n"
-                message += f"Сорт: {style}\n"
+                parts = [f"Кран {beer.tap_position}:\n"]
+                parts.append(f"Пивоварня: {beer.brewery}\n")
+                parts.append(f"Название: {beer.name}\n")
+                parts.append(f"Сорт: {beer.style}\n")
                 
                 # Показываем ABV и IBU если есть
-                if abv:
-                    message += f"Алкоголь: {abv}%\n"
-                if ibu:
-                    message += f"Горечь: {ibu} IBU\n"
+                if beer.abv:
+                    parts.append(f"Алкоголь: {beer.abv}%\n")
+                if beer.ibu:
+                    parts.append(f"Горечь: {beer.ibu} IBU\n")
                 
                 # Ссылка на Untappd отдельной строкой
-                if untappd_url:
-                    message += f"Untappd: {untappd_url}\n"
+                if beer.untappd_url:
+                    parts.append(f"Untappd: {beer.untappd_url}\n")
                 
                 # Показываем цену за литр только админам
                 if is_admin:
-                    message += f"Цена: {price:.2f} руб/л\n"
+                    parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
                 
                 # Стоимость показываем всем
-                message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-                message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
+                parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+                parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n")
                 
-                if description:
-                    message += f"Описание: {description}"
+                if beer.description:
+                    parts.append(f"Описание: {beer.description}")
                 
+                message = "".join(parts)
                 await update.message.reply_text(message, parse_mode='Markdown')
             else:
                 await update.message.reply_text(f"Кран {tap_position} не найден")
@@ -556,88 +1104,40 @@ class BeerBot:
         except ValueError:
             await update.message.reply_text("Ошибка: Введите корректный номер крана")
     
+    @require_admin
     async def admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Панель администратора"""
-        user_id = update.effective_user.id
-        
-        if not self.is_admin(user_id):
-            await update.message.reply_text("У вас нет прав администратора")
-            return
-        
         # Админская панель
-        keyboard = [
-            [
-                InlineKeyboardButton("Краны", callback_data="show_taps"),
-                InlineKeyboardButton("Поиск", callback_data="search_beer")
-            ],
-            [
-                InlineKeyboardButton("Добавить", callback_data="add_beer"),
-                InlineKeyboardButton("Редактировать", callback_data="update_beer")
-            ],
-            [
-                InlineKeyboardButton("Удалить", callback_data="delete_beer"),
-                InlineKeyboardButton("История", callback_data="show_history")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         await update.message.reply_text(
             "ПАНЕЛЬ АДМИНИСТРАТОРА\n\n"
             "Выберите действие:",
-            reply_markup=reply_markup,
+            reply_markup=self._admin_panel_markup,
             parse_mode='Markdown'
         )
     
+    @require_admin
     async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Управление историей пива (только для администраторов)"""
-        user_id = update.effective_user.id
-        
-        if not self.is_admin(user_id):
-            await update.message.reply_text("У вас нет прав администратора")
-            return
-        
         # Получаем историю
-        history = self.db.get_beer_history(50)
+        history = await self._cached_history(50)
         
         if not history:
             await update.message.reply_text("История пуста")
             return
         
         # Создаем кнопки с историей
-        keyboard = []
-        for beer in history:
-            beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
-            button_text = f"{brewery} - {name} (×{added_count})"
-            if len(button_text) > 60:
-                button_text = button_text[:57] + "..."
-            keyboard.append([
-                InlineKeyboardButton(
-                    button_text,
-                    callback_data=f"history_info_{beer_id}"
-                )
-            ])
-        
-        # Кнопка очистки всей истории
-        keyboard.append([
-            InlineKeyboardButton("🗑 Очистить всю историю", callback_data="clear_all_history")
-        ])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = _build_history_markup(tuple(history), "🗑 Очистить всю историю")
         await update.message.reply_text(
             "ИСТОРИЯ ПИВА\n\n"
             "Нажмите на пиво для просмотра или удаления:",
             reply_markup=reply_markup
         )
     
+    @require_admin
     async def add_beer_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Добавление нового пива"""
         user_id = update.effective_user.id
         
-        if not self.is_admin(user_id):
-            await update.message.reply_text("У вас нет прав администратора")
-            return
-        
         if len(context.args) < 6:
             await update.message.reply_text(
                 "Использование: /add <номер_крана> <пивоварня> <название> <сорт> <цена> <стоимость> [описание]\n\n"
@@ -669,33 +1169,36 @@ class BeerBot:
             description = args[7] if len(args) > 7 else ""
             
             # Проверяем, не занят ли кран
-            existing_beer = self.db.get_beer_by_tap(tap_position)
+            existing_beer = await self._cached_beer_by_tap(tap_position)
             if existing_beer:
                 await update.message.reply_text(f"Кран {tap_position} уже занят пивом \"{existing_beer[3]}\"")
                 return
             
             # Добавляем пиво
-            success = self.db.add_beer(tap_position, brewery, name, style, price, description, cost_400ml, cost_250ml)
+            success = await self._db(self.db.add_beer, tap_position, brewery, name, style, price, description,
+                                     cost_400ml, cost_250ml)
+            self._beers_changed()
             
             if success:
                 user_id = update.effective_user.id
                 is_admin = self.is_admin(user_id)
                 
-                message = f"Пиво успешно добавлено!\n\n"
-                message += f"Кран: {tap_position}\n"
-                message += f"Пивоварня: {brewery}\n"
-                message += f"Название: {name}\n"
-                message += f"Сорт: {style}\n"
+                parts = [f"Пиво успешно добавлено!\n\n"]
+                parts.append(f"Кран: {tap_position}\n")
+                parts.append(f"Пивоварня: {brewery}\n")
+                parts.append(f"Название: {name}\n")
+                parts.append(f"Сорт: {style}\n")
                 
                 # Показываем цену за литр только админам
                 if is_admin:
-                    message += f"Цена: {price:.2f} руб/л\n"
+                    parts.append(f"Цена: {price:.2f} руб/л\n")
                 
                 # Стоимость показываем всем
-                message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-                message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
+                parts.append(f"Стоимость 400мл: {cost_400ml:.2f} руб\n")
+                parts.append(f"Стоимость 250мл: {cost_250ml:.2f} руб\n")
                 
-                message += f"Описание: {description if description else 'Нет'}"
+                parts.append(f"Описание: {description if description else 'Нет'}")
+                message = "".join(parts)
                 
                 await update.message.reply_text(message)
             else:
@@ -706,14 +1209,9 @@ class BeerBot:
         except Exception as e:
             await update.message.reply_text(f"Ошибка при добавлении: {e}")
     
+    @require_admin
     async def update_beer_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Редактирование пива"""
-        user_id = update.effective_user.id
-        
-        if not self.is_admin(user_id):
-            await update.message.reply_text("У вас нет прав администратора")
-            return
-        
         if len(context.args) < 3:
             await update.message.reply_text(
                 "Использование: /update <номер_крана> <поле> <новое_значение>\n\n"
@@ -743,7 +1241,7 @@ class BeerBot:
             new_value = args[2]
             
             # Проверяем существование пива
-            existing_beer = self.db.get_beer_by_tap(tap_position)
+            existing_beer = await self._cached_beer_by_tap(tap_position)
             if not existing_beer:
                 await update.message.reply_text(f"Кран {tap_position} не найден")
                 return
@@ -763,7 +1261,8 @@ class BeerBot:
                     return
             
             # Обновляем пиво
-            success = self.db.update_beer_field(tap_position, field, new_value)
+            success = await self._db(self.db.update_beer_field, tap_position, field, new_value)
+            self._beers_changed()
             
             if success:
                 await update.message.reply_text(
@@ -778,14 +1277,9 @@ class BeerBot:
         except Exception as e:
             await update.message.reply_text(f"Ошибка при обновлении: {e}")
     
+    @require_admin
     async def delete_beer_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Удаление пива"""
-        user_id = update.effective_user.id
-        
-        if not self.is_admin(user_id):
-            await update.message.reply_text("У вас нет прав администратора")
-            return
-        
         if not context.args:
             await update.message.reply_text(
                 "Использование: /delete <номер_крана>\n\n"
@@ -798,13 +1292,14 @@ class BeerBot:
             tap_position = int(context.args[0])
             
             # Проверяем существование пива
-            existing_beer = self.db.get_beer_by_tap(tap_position)
+            existing_beer = await self._cached_beer_by_tap(tap_position)
             if not existing_beer:
                 await update.message.reply_text(f"Кран {tap_position} не найден")
                 return
             
             # Удаляем пиво
-            success = self.db.delete_beer(tap_position)
+            success = await self._db(self.db.delete_beer, tap_position)
+            self._beers_changed()
             
             if success:
                 await update.message.reply_text(f"Пиво из крана {tap_position} успешно удалено!")
@@ -825,514 +1320,398 @@ class BeerBot:
         is_admin = self.is_admin(user_id)
         
         if not is_admin:
-            await query.edit_message_text("У вас нет прав администратора")
+            await self._enqueue_edit(query, "У вас нет прав администратора")
             return
         
         data = query.data
         
-        if data == "add_beer":
-            # Показываем доступные краны
-            beers = self.db.get_all_beers()
-            occupied_taps = [beer[1] for beer in beers]  # tap_position
-            
-            available_taps = []
-            for i in range(1, 22):  # Максимум 21 кран
-                if i not in occupied_taps:
-                    available_taps.append(str(i))
-            
-            if not available_taps:
-                keyboard = [
-                    [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "ДОБАВЛЕНИЕ ПИВА\n\n"
-                    "Все краны заняты!",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-                return
-            
-            # Создаем кнопки для выбора крана
-            keyboard = []
-            for i in range(0, len(available_taps), 3):
-                row = []
-                for j in range(3):
-                    if i + j < len(available_taps):
-                        tap_num = available_taps[i + j]
-                        row.append(InlineKeyboardButton(f"Кран {tap_num}", callback_data=f"select_tap_{tap_num}"))
-                keyboard.append(row)
-            
-            keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            # Проверяем наличие истории
-            history = self.db.get_beer_history(1)
-            history_text = ""
-            if history:
-                history_text = "\n\nМожно выбрать из ранее добавленных пив"
-            
-            await query.edit_message_text(
-                f"ДОБАВЛЕНИЕ НОВОГО ПИВА{history_text}\n\n"
-                "Выберите номер крана:",
+        # Обработчик выбирается по точному совпадению данных кнопки или по
+        # префиксу из двух первых слов (edit_tap_, history_info_ и т.п.)
+        handler = CALLBACK_ACTIONS.get(data)
+        if handler is None:
+            handler = CALLBACK_ACTIONS.get("_".join(data.split("_", 2)[:2]) + "_")
+        if handler is None:
+            return
+        return await getattr(self, handler)(query, context, data)
+    
+    async def _cb_add_beer(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Кнопка "Добавить": выбор свободного крана"""
+        # Показываем доступные краны
+        occupied_taps = {beer.tap_position for beer in await self._cached_all_beers()}
+        available_taps = [button for i, button in enumerate(TAP_BUTTONS) if i and i not in occupied_taps]
+        
+        if not available_taps:
+            reply_markup = self._back_to_main_markup
+            await self._enqueue_edit(
+                query,
+                "ДОБАВЛЕНИЕ ПИВА\n\n"
+                "Все краны заняты!",
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
+            return
         
-        elif data == "update_beer":
-            # Показываем существующие краны
-            beers = self.db.get_all_beers()
-            
-            if not beers:
-                keyboard = [
-                    [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "РЕДАКТИРОВАНИЕ ПИВА\n\n"
-                    "Краны пусты!",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-                return
-            
-            # Создаем кнопки для выбора крана
-            keyboard = []
-            for i in range(0, len(beers), 2):
-                row = []
-                for j in range(2):
-                    if i + j < len(beers):
-                        beer = beers[i + j]
-                        id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-                        row.append(InlineKeyboardButton(f"Кран {tap_pos}: {name}", callback_data=f"edit_tap_{tap_pos}"))
-                keyboard.append(row)
-            
-            keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
+        # Создаем кнопки для выбора крана
+        keyboard = [available_taps[i:i + 3] for i in range(0, len(available_taps), 3)]
+        
+        keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        # Проверяем наличие истории
+        history = await self._cached_history(1)
+        history_text = ""
+        if history:
+            history_text = "\n\nМожно выбрать из ранее добавленных пив"
+        
+        await self._enqueue_edit(
+            query,
+            f"ДОБАВЛЕНИЕ НОВОГО ПИВА{history_text}\n\n"
+            "Выберите номер крана:",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
+    async def _cb_update_beer(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Кнопка "Редактировать": выбор крана для редактирования"""
+        # Показываем существующие краны
+        beers = await self._cached_all_beers()
+        
+        if not beers:
+            reply_markup = self._back_to_main_markup
+            await self._enqueue_edit(
+                query,
                 "РЕДАКТИРОВАНИЕ ПИВА\n\n"
-                "Выберите кран для редактирования:",
+                "Краны пусты!",
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
+            return
         
-        elif data == "delete_beer":
-            # Показываем существующие краны
-            beers = self.db.get_all_beers()
-            
-            if not beers:
-                keyboard = [
-                    [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "УДАЛЕНИЕ ПИВА\n\n"
-                    "Краны пусты!",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-                return
-            
-            # Создаем кнопки для выбора крана
-            keyboard = []
-            for i in range(0, len(beers), 2):
-                row = []
-                for j in range(2):
-                    if i + j < len(beers):
-                        beer = beers[i + j]
-                        id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-                        row.append(InlineKeyboardButton(f"Кран {tap_pos}: {name}", callback_data=f"delete_tap_{tap_pos}"))
-                keyboard.append(row)
-            
-            keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
+        # Создаем кнопки для выбора крана
+        keyboard = []
+        for i in range(0, len(beers), 2):
+            row = []
+            for j in range(2):
+                if i + j < len(beers):
+                    beer = beers[i + j]
+                    row.append(InlineKeyboardButton(f"Кран {beer.tap_position}: {beer.name}", callback_data=f"edit_tap_{beer.tap_position}"))
+            keyboard.append(row)
+        
+        keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._enqueue_edit(
+            query,
+            "РЕДАКТИРОВАНИЕ ПИВА\n\n"
+            "Выберите кран для редактирования:",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
+    async def _cb_delete_beer(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Кнопка "Удалить": выбор крана для удаления"""
+        # Показываем существующие краны
+        beers = await self._cached_all_beers()
+        
+        if not beers:
+            reply_markup = self._back_to_main_markup
+            await self._enqueue_edit(
+                query,
                 "УДАЛЕНИЕ ПИВА\n\n"
-                "Выберите кран для удаления:",
+                "Краны пусты!",
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
+            return
         
-        elif data == "show_taps":
-            user_id = query.from_user.id
-            is_admin = self.is_admin(user_id)
-            
-            beers = self.db.get_all_beers()
-            
-            if not beers:
-                keyboard = [
-                    [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "КРАНЫ\n\n"
-                    "Краны пусты",
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-                return
-            
-            # Отображение кранов
-            message = "ТЕКУЩИЕ КРАНЫ\n\n"
-            
-            for beer in beers:
-                id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-                message += f"Кран {tap_pos}\n"
-                message += f"Пивоварня: {brewery}\n"
-                message += f"Название: {name}\n"
-                message += f"Сорт: {style}\n"
-                
-                # Показываем цену за литр только админам
-                if is_admin:
-                    message += f"Цена: {price:.2f} руб/л\n"
-                
-                # Стоимость показываем всем
-                message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-                message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
-                
-                if description:
-                    message += f"Описание: {description}\n"
-                message += "\n"
-            
-            keyboard = [
-                [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        # Создаем кнопки для выбора крана
+        keyboard = []
+        for i in range(0, len(beers), 2):
+            row = []
+            for j in range(2):
+                if i + j < len(beers):
+                    beer = beers[i + j]
+                    row.append(InlineKeyboardButton(f"Кран {beer.tap_position}: {beer.name}", callback_data=f"delete_tap_{beer.tap_position}"))
+            keyboard.append(row)
+        
+        keyboard.append([InlineKeyboardButton("Назад", callback_data="back_to_main")])
+        reply_markup = InlineKeyboardMarkup(keyboard)
         
-        # Обработчики для выбора кранов
-        elif data.startswith("edit_tap_"):
-            tap_num = data.split("_")[2]
-            beer = self.db.get_beer_by_tap(int(tap_num))
-            
-            if not beer:
-                await query.edit_message_text(f"Кран {tap_num} не найден!")
-                return
-            
-            context.user_data['conversation_state'] = 'editing_beer'
-            
-            id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-            
-            # Создаем кнопки для выбора поля
-            keyboard = [
-                [InlineKeyboardButton("Пивоварня", callback_data=f"edit_field_{tap_num}_brewery")],
-                [InlineKeyboardButton("Название", callback_data=f"edit_field_{tap_num}_name")],
-                [InlineKeyboardButton("Сорт", callback_data=f"edit_field_{tap_num}_style")],
-                [InlineKeyboardButton("Цена", callback_data=f"edit_field_{tap_num}_price")],
-                [InlineKeyboardButton("Стоимость 400мл", callback_data=f"edit_field_{tap_num}_cost_400ml")],
-                [InlineKeyboardButton("Стоимость 250мл", callback_data=f"edit_field_{tap_num}_cost_250ml")],
-                [InlineKeyboardButton("Описание", callback_data=f"edit_field_{tap_num}_description")],
-                [InlineKeyboardButton("Отмена", callback_data="cancel")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = f"РЕДАКТИРОВАНИЕ КРАНА {tap_num}\n\n"
-            message += f"Пивоварня: {brewery}\n"
-            message += f"Название: {name}\n"
-            message += f"Сорт: {style}\n"
+        await self._enqueue_edit(
+            query,
+            "УДАЛЕНИЕ ПИВА\n\n"
+            "Выберите кран для удаления:",
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
+    async def _cb_show_taps(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Кнопка "Краны": список всех кранов"""
+        user_id = query.from_user.id
+        is_admin = self.is_admin(user_id)
+        
+        beers = await self._cached_all_beers()
+        
+        if not beers:
+            reply_markup = self._back_to_main_markup
+            await self._enqueue_edit(
+                query,
+                "КРАНЫ\n\n"
+                "Краны пусты",
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
+            return
+        
+        # Отображение кранов
+        parts = ["ТЕКУЩИЕ КРАНЫ\n\n"]
+        
+        for beer in beers:
+            parts.append(f"Кран {beer.tap_position}\n")
+            parts.append(f"Пивоварня: {beer.brewery}\n")
+            parts.append(f"Название: {beer.name}\n")
+            parts.append(f"Сорт: {beer.style}\n")
             
             # Показываем цену за литр только админам
             if is_admin:
-                message += f"Цена: {price:.2f} руб/л\n"
+                parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
             
             # Стоимость показываем всем
-            message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-            message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
-            
-            message += f"Описание: {description if description else 'Нет'}\n\n"
-            message += "Выберите поле для редактирования:"
+            parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+            parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n")
             
-            await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+            if beer.description:
+                parts.append(f"Описание: {beer.description}\n")
+            parts.append("\n")
         
-        elif data == "show_history":
-            # Показываем историю пива
-            history = self.db.get_beer_history(50)
-            
-            if not history:
-                keyboard = [
-                    [InlineKeyboardButton("Назад", callback_data="back_to_main")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "ИСТОРИЯ ПИВА\n\n"
-                    "История пуста",
-                    reply_markup=reply_markup
-                )
-                return
-            
-            # Создаем кнопки с историей
-            keyboard = []
-            for beer in history:
-                beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
-                button_text = f"{brewery} - {name} (×{added_count})"
-                if len(button_text) > 60:
-                    button_text = button_text[:57] + "..."
-                keyboard.append([
-                    InlineKeyboardButton(
-                        button_text,
-                        callback_data=f"history_info_{beer_id}"
-                    )
-                ])
-            
-            # Кнопка очистки всей истории
-            keyboard.append([
-                InlineKeyboardButton("Очистить всю историю", callback_data="clear_all_history")
-            ])
-            keyboard.append([
-                InlineKeyboardButton("Назад", callback_data="back_to_main")
-            ])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
-                "ИСТОРИЯ ПИВА\n\n"
-                "Нажмите на пиво для просмотра или удаления:",
-                reply_markup=reply_markup
-            )
+        message = "".join(parts)
         
-        elif data.startswith("history_info_"):
-            # Показываем информацию о пиве из истории
-            history_id = int(data.split("_")[2])
-            beer = self.db.get_beer_from_history(history_id)
-            
-            if not beer:
-                await query.edit_message_text("Пиво не найдено в истории!")
-                return
-            
-            beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
-            
-            message = f"ИНФОРМАЦИЯ О ПИВЕ\n\n"
-            message += f"Пивоварня: {brewery}\n"
-            message += f"Название: {name}\n"
-            message += f"Стиль: {style}\n"
-            if abv:
-                message += f"Алкоголь: {abv}%\n"
-            if ibu:
-                message += f"Горечь: {ibu} IBU\n"
-            if untappd_url:
-                message += f"Untappd: {untappd_url}\n"
-            if description:
-                message += f"Описание: {description}\n"
-            message += f"\nДобавлялось: {added_count} раз(а)"
-            
-            keyboard = [
-                [InlineKeyboardButton("Удалить из истории", callback_data=f"delete_history_{history_id}")],
-                [InlineKeyboardButton("Назад", callback_data="back_to_history")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(message, reply_markup=reply_markup)
+        reply_markup = self._back_to_main_markup
         
-        elif data.startswith("delete_history_"):
-            # Удаление из истории
-            history_id = int(data.split("_")[2])
-            success = self.db.delete_from_history(history_id)
-            
-            if success:
-                await query.answer("Удалено из истории")
-                # Возвращаемся к списку истории
-                history = self.db.get_beer_history(50)
-                
-                if not history:
-                    await query.edit_message_text("История теперь пуста")
-                    return
-                
-                keyboard = []
-                for beer in history:
-                    beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
-                    button_text = f"{brewery} - {name} (×{added_count})"
-                    if len(button_text) > 60:
-                        button_text = button_text[:57] + "..."
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            button_text,
-                            callback_data=f"history_info_{beer_id}"
-                        )
-                    ])
-                
-                keyboard.append([
-                    InlineKeyboardButton("Очистить всю историю", callback_data="clear_all_history")
-                ])
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await query.edit_message_text(
-                    "ИСТОРИЯ ПИВА\n\n"
-                    "Нажмите на пиво для просмотра или удаления:",
-                    reply_markup=reply_markup
-                )
-            else:
-                await query.answer("Ошибка при удалении")
+        await self._enqueue_edit(query, message, reply_markup=reply_markup, parse_mode='Markdown')
+    
+    async def _cb_edit_tap(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Выбор крана для редактирования: edit_tap_<номер>"""
+        is_admin = self.is_admin(query.from_user.id)
         
-        elif data == "clear_all_history":
-            # Подтверждение очистки всей истории
-            keyboard = [
-                [InlineKeyboardButton("Да, очистить", callback_data="confirm_clear_history")],
-                [InlineKeyboardButton("Отмена", callback_data="back_to_history")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                "ПОДТВЕРЖДЕНИЕ\n\n"
-                "Вы уверены, что хотите очистить всю историю пива?\n"
-                "Это действие нельзя отменить!",
-                reply_markup=reply_markup
-            )
+        tap_num = data.split("_")[2]
+        beer = await self._cached_beer_by_tap(int(tap_num))
         
-        elif data == "confirm_clear_history":
-            # Очистка всей истории
-            success = self.db.clear_all_history()
-            
-            if success:
-                await query.answer("История очищена")
-                await query.edit_message_text("История пива полностью очищена")
-            else:
-                await query.answer("Ошибка при очистке")
+        if not beer:
+            await self._enqueue_edit(query, f"Кран {tap_num} не найден!")
+            return
         
-        elif data == "back_to_history":
-            # Возврат к списку истории
-            history = self.db.get_beer_history(50)
-            
-            if not history:
-                await query.edit_message_text("История пуста")
-                return
-            
-            keyboard = []
-            for beer in history:
-                beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
-                button_text = f"{brewery} - {name} (×{added_count})"
-                if len(button_text) > 60:
-                    button_text = button_text[:57] + "..."
-                keyboard.append([
-                    InlineKeyboardButton(
-                        button_text,
-                        callback_data=f"history_info_{beer_id}"
-                    )
-                ])
-            
-            keyboard.append([
-                InlineKeyboardButton("Очистить всю историю", callback_data="clear_all_history")
-            ])
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
-                "ИСТОРИЯ ПИВА\n\n"
-                "Нажмите на пиво для просмотра или удаления:",
-                reply_markup=reply_markup
-            )
+        context.user_data['conversation_state'] = 'editing_beer'
         
-        elif data.startswith("delete_tap_"):
-            tap_num = data.split("_")[2]
-            beer = self.db.get_beer_by_tap(int(tap_num))
-            
-            if not beer:
-                await query.edit_message_text(f"Кран {tap_num} не найден!")
-                return
-            
-            context.user_data['conversation_state'] = 'deleting_beer'
-            
-            id_val, tap_pos, brewery, name, style, price, description, cost_400ml, cost_250ml, untappd_url, abv, ibu = beer
-            
-            # Кнопки подтверждения
-            keyboard = [
-                [InlineKeyboardButton("Да, удалить", callback_data=f"confirm_delete_{tap_num}")],
-                [InlineKeyboardButton("Отмена", callback_data="cancel")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            message = f"ПОДТВЕРЖДЕНИЕ УДАЛЕНИЯ\n\n"
-            message += f"Кран {tap_num}: {name} от {brewery}\n"
-            message += f"Сорт: {style}\n"
-            
-            # Показываем цену за литр только админам
-            if is_admin:
-                message += f"Цена: {price:.2f} руб/л\n"
-            
-            # Стоимость показываем всем
-            message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-            message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n\n"
-            
-            message += "Вы уверены, что хотите удалить это пиво?"
-            
-            await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        # Создаем кнопки для выбора поля
+        keyboard = [
+            [InlineKeyboardButton("Пивоварня", callback_data=f"edit_field_{tap_num}_brewery")],
+            [InlineKeyboardButton("Название", callback_data=f"edit_field_{tap_num}_name")],
+            [InlineKeyboardButton("Сорт", callback_data=f"edit_field_{tap_num}_style")],
+            [InlineKeyboardButton("Цена", callback_data=f"edit_field_{tap_num}_price")],
+            [InlineKeyboardButton("Стоимость 400мл", callback_data=f"edit_field_{tap_num}_cost_400ml")],
+            [InlineKeyboardButton("Стоимость 250мл", callback_data=f"edit_field_{tap_num}_cost_250ml")],
+            [InlineKeyboardButton("Описание", callback_data=f"edit_field_{tap_num}_description")],
+            [InlineKeyboardButton("Отмена", callback_data="cancel")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
         
-        elif data.startswith("confirm_delete_"):
-            tap_num = data.split("_")[2]
-            success = self.db.delete_beer(int(tap_num))
-            
-            if success:
-                await query.edit_message_text(f"Пиво из крана {tap_num} успешно удалено!")
-            else:
-                await query.edit_message_text("Ошибка при удалении пива!")
-        
-        elif data.startswith("edit_field_"):
-            # Формат: edit_field_<tap_num>_<field>
-            # Поле может содержать подчеркивания (например cost_400ml)
-            parts = data.split("_", 3)  # Разбиваем максимум на 4 части
-            tap_num = parts[2]
-            field = parts[3] if len(parts) > 3 else ""
-            
-            print(f"DEBUG: Редактирование - data={data}, tap_num={tap_num}, field={field}")
-            
-            context.user_data['editing_tap'] = int(tap_num)
-            context.user_data['editing_field'] = field
-            context.user_data['conversation_state'] = 'editing_field'
-            
-            field_names = {
-                'brewery': 'пивоварню',
-                'name': 'название',
-                'style': 'сорт',
-                'price': 'цену за литр',
-                'cost_400ml': 'стоимость 400мл',
-                'cost_250ml': 'стоимость 250мл',
-                'description': 'описание'
-            }
-            
-            await query.edit_message_text(
-                f"РЕДАКТИРОВАНИЕ КРАНА {tap_num}\n\n"
-                f"Введите новое значение для {field_names.get(field, field)}:"
-            )
-            return EDITING_VALUE
+        parts = [f"РЕДАКТИРОВАНИЕ КРАНА {tap_num}\n\n"]
+        parts.append(f"Пивоварня: {beer.brewery}\n")
+        parts.append(f"Название: {beer.name}\n")
+        parts.append(f"Сорт: {beer.style}\n")
         
-        elif data == "cancel":
-            await query.edit_message_text("Операция отменена")
-            context.user_data.clear()
+        # Показываем цену за литр только админам
+        if is_admin:
+            parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
         
-        elif data == "back_to_main":
-            # Возврат к главному меню
-            user_id = query.from_user.id
-            is_admin = self.is_admin(user_id)
-            
-            if is_admin:
-                keyboard = [
-                    [
-                        InlineKeyboardButton("Краны", callback_data="show_taps"),
-                        InlineKeyboardButton("Поиск", callback_data="search_beer")
-                    ],
-                    [
-                        InlineKeyboardButton("Добавить", callback_data="add_beer"),
-                        InlineKeyboardButton("Редактировать", callback_data="update_beer")
-                    ],
-                    [
-                        InlineKeyboardButton("Удалить", callback_data="delete_beer")
-                    ]
-                ]
-                message = "ПАНЕЛЬ АДМИНИСТРАТОРА\n\nВыберите действие:"
-            else:
-                keyboard = [
-                    [
-                        InlineKeyboardButton("Все краны", callback_data="show_taps"),
-                        InlineKeyboardButton("Поиск", callback_data="search_beer")
-                    ],
-                    [
-                        InlineKeyboardButton("Помощь", callback_data="help_info")
-                    ]
-                ]
-                message = "ПИВНЫЕ КРАНЫ\n\nВыберите действие:"
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        # Стоимость показываем всем
+        parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+        parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n")
+        
+        parts.append(f"Описание: {beer.description if beer.description else 'Нет'}\n\n")
+        parts.append("Выберите поле для редактирования:")
+        message = "".join(parts)
+        
+        await self._enqueue_edit(query, message, reply_markup=reply_markup, parse_mode='Markdown')
+    
+    async def _cb_show_history(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Кнопка "История": список истории пива"""
+        await self._render_history(query, context, "ИСТОРИЯ ПИВА\n\nИстория пуста",
+                                   empty_markup=self._back_to_main_markup, back=True)
+    
+    async def _cb_history_info(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Информация о пиве из истории: history_info_<id>"""
+        # Показываем информацию о пиве из истории
+        history_id = int(data.split("_")[2])
+        beer = await self._db(self.db.get_beer_from_history, history_id)
+        
+        if not beer:
+            await self._enqueue_edit(query, "Пиво не найдено в истории!")
+            return
+        
+        parts = [f"ИНФОРМАЦИЯ О ПИВЕ\n\n"]
+        parts.append(f"Пивоварня: {beer.brewery}\n")
+        parts.append(f"Название: {beer.name}\n")
+        parts.append(f"Стиль: {beer.style}\n")
+        if beer.abv:
+            parts.append(f"Алкоголь: {beer.abv}%\n")
+        if beer.ibu:
+            parts.append(f"Горечь: {beer.ibu} IBU\n")
+        if beer.untappd_url:
+            parts.append(f"Untappd: {beer.untappd_url}\n")
+        if beer.description:
+            parts.append(f"Описание: {beer.description}\n")
+        parts.append(f"\nДобавлялось: {beer.added_count} раз(а)")
+        message = "".join(parts)
+        
+        keyboard = [
+            [InlineKeyboardButton("Удалить из истории", callback_data=f"delete_history_{history_id}")],
+            [InlineKeyboardButton("Назад", callback_data="back_to_history")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await self._enqueue_edit(query, message, reply_markup=reply_markup)
+    
+    async def _cb_delete_history(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Удаление записи истории: delete_history_<id>"""
+        # Удаление из истории
+        history_id = int(data.split("_")[2])
+        success = await self._db(self.db.delete_from_history, history_id)
+        self._history_changed()
+        
+        if success:
+            await query.answer("Удалено из истории")
+            # Возвращаемся к списку истории, снимок устарел после удаления
+            await self._render_history(query, context, "История теперь пуста")
+        else:
+            await query.answer("Ошибка при удалении")
+    
+    async def _cb_clear_all_history(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Подтверждение очистки всей истории"""
+        # Подтверждение очистки всей истории
+        await self._enqueue_edit(
+            query,
+            "ПОДТВЕРЖДЕНИЕ\n\n"
+            "Вы уверены, что хотите очистить всю историю пива?\n"
+            "Это действие нельзя отменить!",
+            reply_markup=self._confirm_clear_history_markup
+        )
+    
+    async def _cb_confirm_clear_history(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Очистка всей истории после подтверждения"""
+        # Очистка всей истории
+        success = await self._db(self.db.clear_all_history)
+        self._history_changed()
+        
+        if success:
+            await query.answer("История очищена")
+            await self._enqueue_edit(query, "История пива полностью очищена")
+        else:
+            await query.answer("Ошибка при очистке")
+    
+    async def _cb_back_to_history(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Возврат к списку истории"""
+        # Список берется из снимка, если история с тех пор не менялась
+        await self._render_history(query, context, "История пуста")
+    
+    async def _cb_delete_tap(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Подтверждение удаления крана: delete_tap_<номер>"""
+        is_admin = self.is_admin(query.from_user.id)
+        
+        tap_num = data.split("_")[2]
+        beer = await self._cached_beer_by_tap(int(tap_num))
+        
+        if not beer:
+            await self._enqueue_edit(query, f"Кран {tap_num} не найден!")
+            return
+        
+        context.user_data['conversation_state'] = 'deleting_beer'
+        
+        # Кнопки подтверждения
+        keyboard = [
+            [InlineKeyboardButton("Да, удалить", callback_data=f"confirm_delete_{tap_num}")],
+            [InlineKeyboardButton("Отмена", callback_data="cancel")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        parts = [f"ПОДТВЕРЖДЕНИЕ УДАЛЕНИЯ\n\n"]
+        parts.append(f"Кран {tap_num}: {beer.name} от {beer.brewery}\n")
+        parts.append(f"Сорт: {beer.style}\n")
+        
+        # Показываем цену за литр только админам
+        if is_admin:
+            parts.append(f"Цена: {beer.price_per_liter:.2f} руб/л\n")
+        
+        # Стоимость показываем всем
+        parts.append(f"Стоимость 400мл: {beer.cost_400ml:.2f} руб\n")
+        parts.append(f"Стоимость 250мл: {beer.cost_250ml:.2f} руб\n\n")
+        
+        parts.append("Вы уверены, что хотите удалить это пиво?")
+        message = "".join(parts)
+        
+        await self._enqueue_edit(query, message, reply_markup=reply_markup, parse_mode='Markdown')
+    
+    async def _cb_confirm_delete(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Удаление пива из крана: confirm_delete_<номер>"""
+        tap_num = data.split("_")[2]
+        success = await self._db(self.db.delete_beer, int(tap_num))
+        self._beers_changed()
+        
+        if success:
+            await self._enqueue_edit(query, f"Пиво из крана {tap_num} успешно удалено!")
+        else:
+            await self._enqueue_edit(query, "Ошибка при удалении пива!")
+    
+    async def _cb_edit_field(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Выбор поля для редактирования: edit_field_<номер>_<поле>"""
+        # Формат: edit_field_<tap_num>_<field>
+        # Поле может содержать подчеркивания (например cost_400ml)
+        parts = data.split("_", 3)  # Разбиваем максимум на 4 части
+        tap_num = parts[2]
+        field = parts[3] if len(parts) > 3 else ""
+        
+        print(f"DEBUG: Редактирование - data={data}, tap_num={tap_num}, field={field}")
+        
+        context.user_data['editing_tap'] = int(tap_num)
+        context.user_data['editing_field'] = field
+        context.user_data['conversation_state'] = 'editing_field'
+        
+        field_names = {
+            'brewery': 'пивоварню',
+            'name': 'название',
+            'style': 'сорт',
+            'price': 'цену за литр',
+            'cost_400ml': 'стоимость 400мл',
+            'cost_250ml': 'стоимость 250мл',
+            'description': 'описание'
+        }
+        
+        await self._enqueue_edit(
+            query,
+            f"РЕДАКТИРОВАНИЕ КРАНА {tap_num}\n\n"
+            f"Введите новое значение для {field_names.get(field, field)}:"
+        )
+        return EDITING_VALUE
+    
+    async def _cb_cancel(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Отмена текущей операции"""
+        await self._enqueue_edit(query, "Операция отменена")
+        context.user_data.clear()
+    
+    async def _cb_back_to_main(self, query, context: ContextTypes.DEFAULT_TYPE, data: str):
+        """Возврат к главному меню"""
+        user_id = query.from_user.id
+        is_admin = self.is_admin(user_id)
+        
+        if is_admin:
+            reply_markup = self._main_admin_markup
+            message = "ПАНЕЛЬ АДМИНИСТРАТОРА\n\nВыберите действие:"
+        else:
+            reply_markup = self._main_user_markup
+            message = "ПИВНЫЕ КРАНЫ\n\nВыберите действие:"
+        
+        await self._enqueue_edit(query, message, reply_markup=reply_markup, parse_mode='Markdown')
     
     async def unknown_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик неизвестных команд"""
@@ -1350,7 +1729,7 @@ class BeerBot:
         context.user_data['conversation_state'] = 'adding_beer'
         
         # Проверяем наличие истории пива
-        history = self.db.get_beer_history(10)
+        history = await self._cached_history(10)
         
         if history:
             # Показываем кнопки выбора: из истории или новое пиво
@@ -1360,7 +1739,8 @@ class BeerBot:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await query.edit_message_text(
+            await self._enqueue_edit(
+                query,
                 f"ДОБАВЛЕНИЕ ПИВА В КРАН {tap_num}\n\n"
                 "Выберите вариант:",
                 reply_markup=reply_markup,
@@ -1369,7 +1749,8 @@ class BeerBot:
             return SELECTING_BEER_VARIANT
         else:
             # Нет истории - сразу просим ввести пивоварню и название
-            await query.edit_message_text(
+            await self._enqueue_edit(
+                query,
                 f"ДОБАВЛЕНИЕ ПИВА В КРАН {tap_num}\n\n"
                 "Введите пивоварню и название пива через запятую:\n"
                 "Например: Балтика, Балтика 9",
@@ -1401,12 +1782,19 @@ class BeerBot:
         
         # Ищем варианты на Untappd
         await update.message.reply_text("Ищу на Untappd...")
-        search_results = search_untappd_beers(search_query)
+        search_results = await search_untappd_beers(self.http, search_query)
         
         if search_results:
             # Сохраняем варианты в context
             context.user_data['untappd_variants'] = search_results
             
+            # Пока пользователь выбирает вариант, параллельно подгружаем
+            # детали всех вариантов в кэш
+            context.application.create_task(
+                prefetch_beer_details(self.http, [result['url'] for result in search_results],
+                                      self._untappd_limit)
+            )
+            
             # Создаем кнопки с вариантами
             keyboard = []
             for idx, result in enumerate(search_results):
@@ -1454,10 +1842,11 @@ class BeerBot:
             context.user_data['adding_tap'] = int(tap_num)
             
             # Получаем историю пива
-            history = self.db.get_beer_history(20)
+            history = await self._cached_history(20)
             
             if not history:
-                await query.edit_message_text(
+                await self._enqueue_edit(
+                    query,
                     "История пуста\n\n"
                     "Введите пивоварню и название пива через запятую:\n"
                     "Например: Балтика, Балтика 9"
@@ -1467,15 +1856,14 @@ class BeerBot:
             # Создаем кнопки с историей
             keyboard = []
             for beer in history:
-                beer_id, brewery, name, style, description, untappd_url, abv, ibu, added_count, last_added = beer
                 # Показываем пивоварню и название
-                button_text = f"{brewery} - {name}"
+                button_text = f"{beer.brewery} - {beer.name}"
                 if len(button_text) > 60:
                     button_text = button_text[:57] + "..."
                 keyboard.append([
                     InlineKeyboardButton(
                         button_text,
-                        callback_data=f"history_beer_{beer_id}"
+                        callback_data=f"history_beer_{beer.id}"
                     )
                 ])
             
@@ -1485,7 +1873,8 @@ class BeerBot:
             ])
             
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await query.edit_message_text(
+            await self._enqueue_edit(
+                query,
                 f"ВЫБОР ПИВА ИЗ ИСТОРИИ\n\n"
                 "Выберите пиво:",
                 reply_markup=reply_markup
@@ -1497,7 +1886,8 @@ class BeerBot:
             tap_num = data.split("_")[2]
             context.user_data['adding_tap'] = int(tap_num)
             
-            await query.edit_message_text(
+            await self._enqueue_edit(
+                query,
                 f"ДОБАВЛЕНИЕ НОВОГО ПИВА В КРАН {tap_num}\n\n"
                 "Введите пивоварню и название пива через запятую:\n"
                 "Например: Балтика, Балтика 9"
@@ -1507,42 +1897,40 @@ class BeerBot:
         # Обработка выбора пива из истории
         elif data.startswith("history_beer_"):
             beer_id = int(data.split("_")[2])
-            beer = self.db.get_beer_from_history(beer_id)
+            beer = await self._db(self.db.get_beer_from_history, beer_id)
             
             if not beer:
-                await query.edit_message_text("Ошибка: пиво не найдено в истории")
+                await self._enqueue_edit(query, "Ошибка: пиво не найдено в истории")
                 return ConversationHandler.END
             
-            # Распаковываем данные из истории
-            _, brewery, name, style, description, untappd_url, abv, ibu, _, _ = beer
-            
             # Сохраняем данные в context
-            context.user_data['adding_brewery'] = brewery
-            context.user_data['adding_name'] = name
-            context.user_data['adding_style'] = style
-            context.user_data['beer_description'] = description or ""
-            context.user_data['untappd_url'] = untappd_url or ""
-            context.user_data['beer_abv'] = abv
-            context.user_data['beer_ibu'] = ibu
+            context.user_data['adding_brewery'] = beer.brewery
+            context.user_data['adding_name'] = beer.name
+            context.user_data['adding_style'] = beer.style
+            context.user_data['beer_description'] = beer.description or ""
+            context.user_data['untappd_url'] = beer.untappd_url or ""
+            context.user_data['beer_abv'] = beer.abv
+            context.user_data['beer_ibu'] = beer.ibu
             
             # Показываем информацию и просим ввести цену
-            info_message = f"Выбрано из истории:\n\n"
-            info_message += f"Пивоварня: {brewery}\n"
-            info_message += f"Название: {name}\n"
-            info_message += f"Стиль: {style}\n"
-            if abv:
-                info_message += f"Алкоголь: {abv}%\n"
-            if ibu:
-                info_message += f"Горечь: {ibu} IBU\n"
-            info_message += f"\nВведите цену за литр (в рублях):"
-            
-            await query.edit_message_text(info_message)
+            parts = [f"Выбрано из истории:\n\n"]
+            parts.append(f"Пивоварня: {beer.brewery}\n")
+            parts.append(f"Название: {beer.name}\n")
+            parts.append(f"Стиль: {beer.style}\n")
+            if beer.abv:
+                parts.append(f"Алкоголь: {beer.abv}%\n")
+            if beer.ibu:
+                parts.append(f"Горечь: {beer.ibu} IBU\n")
+            parts.append(f"\nВведите цену за литр (в рублях):")
+            info_message = "".join(parts)
+            
+            await self._enqueue_edit(query, info_message)
             return ADDING_PRICE
         
         # Обработка ручного ввода названия
         if data == "manual_input_name":
             # Пользователь хочет ввести название вручную
-            await query.edit_message_text("Введите название пива:")
+            await self._enqueue_edit(query, "Введите название пива:")
             return ADDING_NAME
         
         elif data.startswith("select_beer_"):
@@ -1550,13 +1938,16 @@ class BeerBot:
             idx = int(data.split("_")[2])
             selected_beer = context.user_data['untappd_variants'][idx]
             
-            await query.edit_message_text(
+            sent = await self._enqueue_edit(
+                query,
                 f"Выбрано: {selected_beer['name']}\n\n"
                 "Получаю детали с Untappd..."
             )
             
             # Получаем полную информацию о пиве
-            beer_details = get_beer_details(selected_beer['url'])
+            beer_details = await get_beer_details(self.http, selected_beer['url'])
+            # Ответы ниже должны прийти после правки сообщения
+            await sent
             
             if beer_details:
                 # Сохраняем все данные
@@ -1676,32 +2067,35 @@ class BeerBot:
         
         # Добавляем пиво в базу данных
         print(f"DEBUG: Добавляем пиво - кран: {tap_position}, пивоварня: {brewery}, название: {name}")
-        success = self.db.add_beer(tap_position, brewery, name, style, price, description, 
-                                   cost_400ml, cost_250ml, untappd_url, abv, ibu)
+        success = await self._db(self.db.add_beer, tap_position, brewery, name, style, price, description,
+                                 cost_400ml, cost_250ml, untappd_url, abv, ibu)
+        self._beers_changed()
         print(f"DEBUG: Результат добавления: {success}")
         
         # Сохраняем в историю для быстрого доступа в будущем
         if success:
-            self.db.save_to_history(brewery, name, style, description, untappd_url, abv, ibu)
+            await self._db(self.db.save_to_history, brewery, name, style, description, untappd_url, abv, ibu)
+            self._history_changed()
         
         if success:
             user_id = update.effective_user.id
             is_admin = self.is_admin(user_id)
             
-            message = f"Пиво успешно добавлено в кран {tap_position}!\n\n"
-            message += f"Пивоварня: {brewery}\n"
-            message += f"Название: {name}\n"
-            message += f"Сорт: {style}\n"
+            parts = [f"Пиво успешно добавлено в кран {tap_position}!\n\n"]
+            parts.append(f"Пивоварня: {brewery}\n")
+            parts.append(f"Название: {name}\n")
+            parts.append(f"Сорт: {style}\n")
             
             # Показываем цену за литр только админам
             if is_admin:
-                message += f"Цена: {price:.2f} руб/л\n"
+                parts.append(f"Цена: {price:.2f} руб/л\n")
             
             # Стоимость показываем всем
-            message += f"Стоимость 400мл: {cost_400ml:.2f} руб\n"
-            message += f"Стоимость 250мл: {cost_250ml:.2f} руб\n"
+            parts.append(f"Стоимость 400мл: {cost_400ml:.2f} руб\n")
+            parts.append(f"Стоимость 250мл: {cost_250ml:.2f} руб\n")
             
-            message += f"Описание: {description if description else 'Нет'}"
+            parts.append(f"Описание: {description if description else 'Нет'}")
+            message = "".join(parts)
         else:
             message = "Ошибка при добавлении пива"
         
@@ -1734,7 +2128,8 @@ class BeerBot:
         
         # Обновляем пиво
         print(f"DEBUG: Вызов update_beer_field({tap_position}, {field}, {new_value})")
-        success = self.db.update_beer_field(tap_position, field, new_value)
+        success = await self._db(self.db.update_beer_field, tap_position, field, new_value)
+        self._beers_changed()
         print(f"DEBUG: Результат обновления: {success}")
         
         if success:
@@ -1776,47 +2171,43 @@ class BeerBot:
         """Запуск бота"""
         logger.info("Запуск бота...")
         
-        # Регистрируем команды при запуске
+        # Открываем общую HTTP-сессию и регистрируем команды при запуске
         async def post_init(application):
+            self.http = aiohttp.ClientSession(
+                headers=UNTAPPD_HEADERS,
+                timeout=HTTP_TIMEOUT,
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+            )
+            self._untappd_limit = asyncio.Semaphore(UNTAPPD_PREFETCH_LIMIT)
             await self.register_commands()
         
+        # Останавливаем отправку правок, закрываем HTTP-сессию и пул
+        # потоков базы данных при остановке
+        async def post_shutdown(application):
+            if self._send_task is not None:
+                self._send_task.cancel()
+                self._send_task = None
+            for task in list(self._sending.values()):
+                task.cancel()
+            if self.http is not None:
+                await self.http.close()
+                self.http = None
+            self._db_pool.shutdown(wait=True)
+        
         self.application.post_init = post_init
+        self.application.post_shutdown = post_shutdown
         self.application.run_polling()
 
 
 def main():
-    """Основная функция"""
-    print("Запуск Telegram бота для управления пивными кранами...")
-    
-    # Получаем токен из переменной окружения
-    token = os.getenv('TELEGRAM_BOT_TOKEN')
-    if not token:
-        print("Ошибка: Не установлен TELEGRAM_BOT_TOKEN")
-        print("Создайте файл .env с переменной TELEGRAM_BOT_TOKEN")
-        return 1
+    """Основная функция
     
-    # ID администраторов
-    admin_ids_str = os.getenv('ADMIN_IDS', '')
-    if not admin_ids_str:
-        print("Ошибка: Не установлены ADMIN_IDS")
-        print("Создайте файл .env с переменной ADMIN_IDS")
-        return 1
-    
-    admin_ids = [int(x.strip()) for x in admin_ids_str.split(',') if x.strip()]
-    
-    try:
-        # Создаем и запускаем бота
-        bot = BeerBot(token, admin_ids)
-        
-        print("Конфигурация загружена успешно")
-        print("Запуск бота...")
-        
-        bot.run()
-        
-    except Exception as e:
-        print(f"Ошибка при запуске бота: {e}")
-        return 1
+    Конфигурация загружается и проверяется в run_bot.main, здесь
+    передается только уже импортированный класс бота.
+    """
+    from run_bot import main as run_bot_main
+    return run_bot_main(BeerBot)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())